@@ -35,29 +35,68 @@ Module: Multiple Substitution Encryption (MSE)
 Description: Provides an engine for creating and solving puzzles using encryption and decryption mechanisms.
 
 Functions:
-- mse_cipher(msg, auto_copy=True): Encrypts a message using multiple algorithms.
+- mse_cipher(msg, auto_copy=True, header=False): Encrypts a message using multiple algorithms.
 - mse_decipher(msg, auto_copy=False): Decrypts a message to its original form.
+- warm_up(decoder, watch_interval): Loads the configuration, key library and optionally the decoder ahead of use.
+- mse_cipher_many(msgs, chunk_size, max_workers): Encrypts many messages, in parallel for large batches.
+- mse_decipher_many(msgs, chunk_size, max_workers): Decrypts many messages, in parallel for large batches.
+- mse_decipher_parallel(msg, max_workers, chunk_size, executor): Decrypts one large message on a process pool.
+- set_memory_budget(limit): Sets the memory above which messages are processed in chunks.
+- mse_cipher_chunks(msg, chunk_size, header): Encrypts a message a chunk at a time, yielding the ciphertext in pieces.
+- mse_decipher_chunked(msg, chunk_size): Decrypts a message a chunk at a time.
 
 Dependencies:
 - Uses Block A (`complexify` and `decomplexify`), Block B (`cipher` and `decipher`), and Block C (`obscur` and `remove_group_charac_b`).
+- Each stage runs through `instrument.run_stage`, which reports it to any registered sink.
+- Ciphertexts may start with a `header` recording the key used, which `mse_decipher` reads.
+- Messages whose estimated peak memory is above the memory budget take the chunked path.
 
 Author: enrongroup.fr
 Version: 28.0.0
 Date: January 30, 2024
 """
 
-from pyperclip import copy
+from itertools import islice
+from bisect import bisect_right
+import rng
+from collections import deque
+from configs import configs_setting as settings
 from bloc_a import complexify, decomplexify
-from bloc_b import cipher, decipher
-from bloc_c import obscur, remove_group_charac_b
+from bloc_b import (cipher, decipher, cipher_with_key, decipher_with_key, get_snapshot, key_decoder,
+                    compile_key, decode_prefix, decode_span, stitch_spans, watch_key_list)
+from bloc_c import (obscur, remove_group_charac_b, combine_charac_a, get_random_characs_group_b,
+                    scatter_charac_b)
+from instrument import run_stage
+from header import encode_header, parse_header
 
-def mse_cipher(msg, auto_copy=True):
+# Batches smaller than this are processed in the calling process
+BATCH_THRESHOLD = 1000
+DEFAULT_CHUNK_SIZE = 256
+
+# Ciphertexts with fewer characters left after removing the noise are decrypted in the calling process
+PARALLEL_THRESHOLD = 1 << 20
+DECIPHER_CHUNK_SIZE = 1 << 18
+# Characters scanned past each chunk boundary to find where consecutive scans meet
+DECIPHER_OVERLAP = 64
+
+# Peak allocation per character of input measured with `memory_profile` on the default
+# configuration, used to estimate whether a message fits in the memory budget
+CIPHER_PEAK_PER_CHAR = 64
+DECIPHER_PEAK_PER_CHAR = 10
+# Characters of input processed at once on the chunked path
+MEMORY_CHUNK_SIZE = 1 << 16
+
+# Bytes a single call may allocate before switching to the chunked path (None: no limit)
+_memory_budget = None
+
+def mse_cipher(msg, auto_copy=True, header=False):
     """
     Encrypts a message using a sequence of transformations.
 
     Args:
         msg (str): The input message to be encrypted.
         auto_copy (bool): If True, copies the encrypted message to the clipboard.
+        header (bool): If True, prefixes the ciphertext with a header recording the key used.
 
     Returns:
         str: The encrypted message.
@@ -65,11 +104,21 @@ def mse_cipher(msg, auto_copy=True):
     if not isinstance(msg, str):
         raise ValueError("Input must be a string.")
 
-    a = complexify(msg)
-    b = cipher(a)
-    c = obscur(b)
+    if _over_budget(len(msg) * CIPHER_PEAK_PER_CHAR):
+        c = ''.join(mse_cipher_chunks(msg, header=header))
+    elif header:
+        a = run_stage("complexify", complexify, msg)
+        snapshot = get_snapshot()
+        index = rng.below(len(snapshot.keys))
+        b = run_stage("cipher", lambda text: cipher_with_key(text, index, snapshot), a)
+        c = encode_header(index, snapshot.fingerprint) + run_stage("obscur", obscur, b)
+    else:
+        a = run_stage("complexify", complexify, msg)
+        b = run_stage("cipher", cipher, a)
+        c = run_stage("obscur", obscur, b)
 
     if auto_copy:
+        from pyperclip import copy
         copy(c)
 
     return c
@@ -78,6 +127,11 @@ def mse_decipher(msg, auto_copy=False):
     """
     Decrypts a message to its original form.
 
+    A message starting with a header is decoded with the key it records; other
+    messages, and headers from another configuration or key library, are decoded
+    with every key of the library. Messages above the memory budget are decrypted
+    with `mse_decipher_chunked`.
+
     Args:
         msg (str): The encrypted message to be decrypted.
         auto_copy (bool): If True, copies the decrypted message to the clipboard.
@@ -88,12 +142,383 @@ def mse_decipher(msg, auto_copy=False):
     if not isinstance(msg, str):
         raise ValueError("Input must be a string.")
 
-    c = remove_group_charac_b(msg)
-    b = decipher(c)
-    a = decomplexify(b)
+    if _over_budget(len(msg) * DECIPHER_PEAK_PER_CHAR):
+        a = mse_decipher_chunked(msg)
+    else:
+        # The whole call uses one snapshot, even if the key library is reloaded meanwhile
+        snapshot = get_snapshot()
+        index, msg = _read_header(msg, snapshot)
+        c = run_stage("remove_group_charac_b", remove_group_charac_b, msg)
+
+        if index is None:
+            b = run_stage("decipher", lambda text: decipher(text, snapshot), c)
+        else:
+            b = run_stage("decipher", lambda text: decipher_with_key(text, index, snapshot), c)
+        a = run_stage("decomplexify", decomplexify, b)
 
     if auto_copy:
+        from pyperclip import copy
         copy(a)
 
     return a
 
+def _read_header(msg, snapshot):
+    """
+    Returns the key index recorded in the header of a ciphertext and the text after it.
+
+    The index is None when there is no header, or when it was written for another
+    configuration or key library.
+    """
+    parsed = parse_header(msg)
+
+    if parsed and parsed[1] == snapshot.fingerprint and parsed[0] < len(snapshot.keys):
+        return parsed[0], msg[parsed[2]:]
+
+    return None, msg
+
+_watcher = None
+
+def warm_up(decoder=True, watch_interval=None):
+    """
+    Loads the configuration and key library (and the decoder if needed) once per process.
+
+    Args:
+        decoder (bool): If True, also builds the decoder used by `decipher`.
+        watch_interval (float): If set, reloads the key library whenever its file
+            changes, polling every `watch_interval` seconds.
+    """
+    global _watcher
+    snapshot = get_snapshot()
+
+    if decoder:
+        snapshot.decoder
+
+    if watch_interval and _watcher is None:
+        _watcher = watch_key_list(watch_interval)
+
+def _cipher_chunk(msgs):
+    """
+    Encrypts a chunk of messages without touching the clipboard.
+    """
+    return [mse_cipher(msg, False) for msg in msgs]
+
+def _decipher_chunk(msgs):
+    """
+    Decrypts a chunk of messages without touching the clipboard.
+    """
+    return [mse_decipher(msg, False) for msg in msgs]
+
+def _chunks(iterable, size):
+    """
+    Yields lists of up to `size` items from `iterable`.
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+def _run_many(process_chunk, msgs, chunk_size, max_workers, decoder):
+    """
+    Runs `process_chunk` over `msgs` and returns the results in input order.
+
+    Batches below `BATCH_THRESHOLD` messages, or with `max_workers=1`, stay in the
+    calling process. Larger batches are split into chunks and sent to a process
+    pool whose workers load their state once; at most two chunks per worker are
+    in flight, so the input iterable is consumed progressively.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    msgs = iter(msgs)
+    head = list(islice(msgs, BATCH_THRESHOLD))
+
+    warm_up(decoder)
+
+    if len(head) < BATCH_THRESHOLD or max_workers == 1:
+        return process_chunk(head) + process_chunk(msgs)
+
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import chain
+    import os
+
+    max_workers = max_workers or os.cpu_count() or 1
+    results = []
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers, initializer=warm_up, initargs=(decoder,)) as executor:
+        for chunk in _chunks(chain(head, msgs), chunk_size):
+            pending.append(executor.submit(process_chunk, chunk))
+
+            if len(pending) >= 2 * max_workers:
+                results.extend(pending.popleft().result())
+
+        while pending:
+            results.extend(pending.popleft().result())
+
+    return results
+
+def mse_cipher_many(msgs, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=None):
+    """
+    Encrypts many messages, spreading large batches over a process pool.
+
+    Args:
+        msgs (iterable): The messages to be encrypted.
+        chunk_size (int): The number of messages sent to a worker at once.
+        max_workers (int): The number of worker processes (default: CPU count, 1 to stay in-process).
+
+    Returns:
+        list: The encrypted messages, in input order.
+    """
+    return _run_many(_cipher_chunk, msgs, chunk_size, max_workers, False)
+
+def mse_decipher_many(msgs, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=None):
+    """
+    Decrypts many messages, spreading large batches over a process pool.
+
+    Args:
+        msgs (iterable): The encrypted messages.
+        chunk_size (int): The number of messages sent to a worker at once.
+        max_workers (int): The number of worker processes (default: CPU count, 1 to stay in-process).
+
+    Returns:
+        list: The original messages, in input order.
+    """
+    return _run_many(_decipher_chunk, msgs, chunk_size, max_workers, True)
+
+def _decipher_span(segment, offset, end, overlap, index):
+    """
+    Decodes a span of a noise-free ciphertext in a worker, with positions relative to the whole text.
+    """
+    snapshot = get_snapshot()
+    decoder = snapshot.decoder if index is None else key_decoder(snapshot.keys[index])
+    plain, head, tail = decode_span(segment, 0, end, overlap, decoder)
+
+    return (plain, {position + offset: length for position, length in head.items()},
+            [(position + offset, length) for position, length in tail])
+
+def mse_decipher_parallel(msg, max_workers=None, chunk_size=DECIPHER_CHUNK_SIZE, executor=None):
+    """
+    Decrypts one large message, decoding its substitution tokens on a process pool.
+
+    The noise is removed first, then the token stream is cut into chunks of
+    `chunk_size` characters. A cut may fall inside a token, so each worker scans a
+    little past the end of its chunk and the chunks are stitched where consecutive
+    scans meet, which gives exactly the output of a single scan. `decomplexify`
+    runs on the stitched text. Messages below `PARALLEL_THRESHOLD` characters are
+    decrypted in the calling process.
+
+    Args:
+        msg (str): The encrypted message to be decrypted.
+        max_workers (int): The number of worker processes (default: CPU count, 1 to stay in-process).
+        chunk_size (int): The number of characters decoded per task.
+        executor (Executor): A pool whose workers ran `warm_up`, reused instead of starting one.
+
+    Returns:
+        str: The original message.
+    """
+    if not isinstance(msg, str):
+        raise ValueError("Input must be a string.")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    snapshot = get_snapshot()
+    index, msg = _read_header(msg, snapshot)
+    c = run_stage("remove_group_charac_b", remove_group_charac_b, msg)
+
+    if executor is None and (len(c) < PARALLEL_THRESHOLD or max_workers == 1):
+        if index is None:
+            b = run_stage("decipher", lambda text: decipher(text, snapshot), c)
+        else:
+            b = run_stage("decipher", lambda text: decipher_with_key(text, index, snapshot), c)
+    else:
+        b = run_stage("decipher", lambda text: _decode_parallel(text, index, chunk_size, max_workers, executor), c)
+
+    return run_stage("decomplexify", decomplexify, b)
+
+def _decode_parallel(text, index, chunk_size, max_workers, executor):
+    """
+    Decodes a noise-free ciphertext in chunks on a process pool and stitches the chunks.
+    """
+    overlap = DECIPHER_OVERLAP
+    bounds = [(start, min(start + chunk_size, len(text))) for start in range(0, len(text), chunk_size)]
+
+    def submit(pool, start, end):
+        # The segment covers the overlap scan and the tokens read at its end, shorter than the overlap
+        segment = text[start:end + 2 * overlap]
+        return pool.submit(_decipher_span, segment, start, end - start, overlap, index)
+
+    if executor is None:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers, initializer=warm_up, initargs=(index is None,))
+    else:
+        from contextlib import nullcontext
+        pool = nullcontext(executor)
+
+    with pool as pool:
+        futures = [submit(pool, start, end) for start, end in bounds]
+        spans = [(start, end, future.result()) for (start, end), future in zip(bounds, futures)]
+
+    def redecode(start, end):
+        return _decipher_span(text[start:end + 2 * overlap], start, end - start, overlap, index)
+
+    return stitch_spans(spans, redecode)
+
+def set_memory_budget(limit):
+    """
+    Sets the memory a single `mse_cipher` or `mse_decipher` call may allocate.
+
+    Messages whose estimated peak allocation (`CIPHER_PEAK_PER_CHAR` or
+    `DECIPHER_PEAK_PER_CHAR` bytes per character) is above the budget are
+    processed in chunks of `MEMORY_CHUNK_SIZE` characters instead. The
+    ciphertext returned by `mse_cipher` is still built in full, which takes
+    about twice its size; use `mse_cipher_chunks` to write it out as it comes.
+
+    Args:
+        limit (int): The budget in bytes, or None for no limit.
+    """
+    global _memory_budget
+
+    if limit is not None and limit < 1:
+        raise ValueError("The memory budget must be at least 1 byte.")
+
+    _memory_budget = limit
+
+def _over_budget(estimate):
+    return _memory_budget is not None and estimate > _memory_budget
+
+def _word_chunks(text, chunk_size):
+    """
+    Returns the bounds of consecutive chunks of about `chunk_size` characters,
+    each cut right after a space so no word is split.
+
+    A word longer than `chunk_size` makes a longer chunk. An empty text is one empty chunk.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    bounds = []
+    start = 0
+
+    while True:
+        end = start + chunk_size
+
+        if end >= len(text):
+            bounds.append((start, len(text)))
+            return bounds
+
+        cut = text.rfind(" ", start, end) + 1
+        end = cut if cut > start else text.find(" ", end) + 1 or len(text)
+        bounds.append((start, end))
+        start = end
+
+        if start == len(text):
+            return bounds
+
+def mse_cipher_chunks(msg, chunk_size=MEMORY_CHUNK_SIZE, header=False):
+    """
+    Encrypts a message a chunk at a time, yielding the ciphertext in pieces.
+
+    `complexify` reverses the whole text, so the chunks, cut after spaces, are
+    encrypted from the last to the first: the pieces join into a ciphertext in
+    the format of `mse_cipher`, which `mse_decipher` reads as usual. Every chunk
+    is substituted with the same key. The group B strings are spread over the
+    chunks in proportion to their length, and the first piece gets the
+    interleaved noise of `obscur`. Only one chunk and its copies are held at a
+    time, so the pieces can be written out as they come.
+
+    Args:
+        msg (str): The input message to be encrypted.
+        chunk_size (int): The number of characters encrypted at once.
+        header (bool): If True, the first piece is a header recording the key used.
+
+    Yields:
+        str: The pieces of the ciphertext, in order.
+    """
+    if not isinstance(msg, str):
+        raise ValueError("Input must be a string.")
+
+    config = settings.load_settings()
+    snapshot = get_snapshot()
+    index = rng.below(len(snapshot.keys))
+    table = compile_key(snapshot.keys[index])
+    bounds = _word_chunks(msg, chunk_size)
+
+    if header:
+        yield encode_header(index, snapshot.fingerprint)
+
+    # Count the group B strings falling in each chunk
+    ends = [end for _, end in bounds]
+    counts = [0] * len(bounds)
+    x = rng.randint(config["mini_add_group_b_charac"], config["maxi_add_group_b_charac"])
+
+    for _ in range(x):
+        counts[min(bisect_right(ends, rng.below(len(msg) or 1)), len(bounds) - 1)] += 1
+
+    for n in reversed(range(len(bounds))):
+        start, end = bounds[n]
+        a = run_stage("complexify", complexify, msg[start:end])
+        b = run_stage("cipher", lambda text: text.translate(table), a)
+
+        if n == len(bounds) - 1:
+            def noise(text, count=counts[n]):
+                # Interleave the first characters with two noise strings, as `obscur` does
+                noise_a, noise_b = get_random_characs_group_b(2, config)
+                head_length = min(len(noise_a), len(text))
+                head = combine_charac_a(combine_charac_a(text[:head_length], noise_a), noise_b)
+                return scatter_charac_b(head, text, head_length, count, config)
+        else:
+            def noise(text, count=counts[n]):
+                return scatter_charac_b('', text, 0, count, config)
+
+        yield run_stage("obscur", noise, b)
+
+def mse_decipher_chunked(msg, chunk_size=MEMORY_CHUNK_SIZE):
+    """
+    Decrypts a message a chunk at a time, without full-size copies of the ciphertext.
+
+    The noise is removed and the tokens decoded one chunk of the ciphertext at a
+    time; the characters of a token cut by the chunk end are carried over to the
+    next chunk. `decomplexify` then runs on chunks of the decoded text cut after
+    spaces, joined in reverse order. Only the decoded text, about the size of the
+    original message, is held in full.
+
+    Args:
+        msg (str): The encrypted message to be decrypted.
+        chunk_size (int): The number of ciphertext characters decrypted at once.
+
+    Returns:
+        str: The original message.
+    """
+    if not isinstance(msg, str):
+        raise ValueError("Input must be a string.")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    snapshot = get_snapshot()
+    index, msg = _read_header(msg, snapshot)
+    decoder = snapshot.decoder if index is None else key_decoder(snapshot.keys[index])
+    longest = max(decoder[1], default=0)
+    decoded = []
+    carry = ""
+    position = 0
+
+    def decode_chunk(text):
+        nonlocal position
+        plain, position = decode_prefix(text, stop, decoder)
+        return plain
+
+    for start in range(0, len(msg), chunk_size):
+        text = carry + run_stage("remove_group_charac_b", remove_group_charac_b, msg[start:start + chunk_size])
+
+        # Tokens starting in the last `longest` characters may go on in the next chunk
+        stop = len(text) if start + chunk_size >= len(msg) else len(text) - longest
+        decoded.append(run_stage("decipher", decode_chunk, text))
+        carry = text[position:]
+
+    b = ''.join(decoded)
+    del decoded
+
+    return ''.join(reversed([run_stage("decomplexify", decomplexify, b[start:end])
+                             for start, end in _word_chunks(b, chunk_size)]))
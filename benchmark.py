@@ -0,0 +1,929 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Benchmark
+Description: Measures the speed of the MSE pipeline stages, against their previous implementations
+and across message size, key library size and character database size.
+
+Functions:
+- legacy_cipher(plain_text, key): Reference cipher using one `str.replace` per character of the key.
+- legacy_decipher(coded_msg, keys): Reference decipher using one `str.replace` per token of every key.
+- legacy_obscur(string): Reference obscur built with string concatenation and list inserts.
+- time_call(function, *args, repeat): Returns the best wall time of several calls.
+- bench_cipher(sizes, repeat): Compares the compiled translate table with the replace loop.
+- bench_decipher(sizes, repeat): Compares the single-pass decoder with the replace loop.
+- bench_obscur(sizes, repeat): Compares the single-join noise engine with the legacy obscur.
+- bench_rng(sizes, repeat): Compares buffered `rng` draws with one `random.choice` call per character.
+- bench_header(sizes, repeat): Compares header decryption with one key against the all-keys decoder.
+- bench_reload(added, repeat): Compares extending the decoder with appended keys against rebuilding it.
+- bench_parallel_decipher(size, workers, chunk_size, repeat): Times the parallel decipher of one large message per pool size.
+- bench_packing(sizes, repeat): Measures the size and speed of the packed ciphertext encoding.
+- peak_memory(function, *args): Returns the peak memory allocated by a call, measured with `tracemalloc`.
+- bench_fused(sizes, repeat): Compares the peak memory and speed of the fused and staged encryption.
+- bench_keystore(key_numbers, shard_size, size, repeat): Compares the sharded key store with the all-keys decoder.
+- bench_memory(sizes, repeat): Reports the peak allocation of every stage and compares the chunked path.
+- bench_remove_group_charac_b(sizes, db_sizes, repeat): Compares the deletion table with the per-character string scan.
+- bench_import_time(module, budget): Measures the cold import time of a module with `python -X importtime`.
+- print_comparisons(): Prints every comparison against the previous implementations.
+- make_workspace(directory, key_number, db_size, seed): Writes a fixed `setting.json` and a seeded character database.
+- bench_stages(message_sizes, key_number, repeat, seed): Times every pipeline stage in the current workspace.
+- run_suite(message_sizes, key_numbers, db_sizes, repeat, seed): Runs `bench_stages` for every library and database size.
+- find_regressions(previous, current, threshold): Lists the measurements that got slower than `threshold` times.
+
+Usage:
+- python benchmark.py compare
+- python benchmark.py suite --output results.json [--baseline previous.json]
+- python benchmark.py scaling [--size 2000000 --workers 1 2 4 8]
+- python benchmark.py import-time [--budget 30000] (exits with 1 when over budget)
+
+
+"""
+
+from random import choice, randint, seed, Random
+from time import perf_counter
+from configs import configs_setting as settings
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import bloc_b
+import bloc_c
+import rng
+
+# Cold import budget of MSE, in microseconds
+IMPORT_BUDGET = 30000
+
+# Fixed configuration used by the suite; `key_number` and `substitue_with` are set per run
+SUITE_SETTINGS = {
+    "cipher": "ascii_letters",
+    "special_charac": "easintrluodchEASINTRLUODCH0123456789!#$%&'()*+,-./:;<=>?@[]",
+    "cipher_punctuation": "True",
+    "cipher_accent": "True",
+    "cipher_digits": "True",
+    "charac_len": [5, 6],
+    "len_special_charac": [3, 4],
+    "len_charac_group_b": [8, 11],
+    "mini_add_group_b_charac": 7,
+    "max_add_group_b_charac": 9
+}
+SUITE_MESSAGE_SIZES = (100, 1000, 10000)
+SUITE_KEY_NUMBERS = (100, 1000)
+SUITE_DB_SIZES = (2000, 20000)
+
+def legacy_cipher(plain_text, key):
+    """
+    Reference cipher using one `str.replace` per character of the key.
+
+    Args:
+        plain_text (str): The text to be encrypted.
+        key (str): A line from the key library.
+
+    Returns:
+        str: The encrypted text.
+    """
+    key = key.strip().split(' ')
+    charac_sub = settings.charac_sub
+
+    for c in range(len(charac_sub)):
+        plain_text = plain_text.replace(charac_sub[c], key[c])
+
+    return plain_text
+
+def legacy_decipher(coded_msg, keys):
+    """
+    Reference decipher using one `str.replace` per token of every key.
+
+    Args:
+        coded_msg (str): The text to be decrypted.
+        keys (list): Key library lines.
+
+    Returns:
+        str: The original text.
+    """
+    charac_sub = settings.charac_sub
+
+    for key in keys:
+        key = key.strip().split(' ')
+
+        for n in range(len(charac_sub)):
+            coded_msg = coded_msg.replace(key[n], charac_sub[n])
+
+    return coded_msg
+
+def legacy_obscur(string):
+    """
+    Reference obscur built with string concatenation and list inserts.
+
+    Args:
+        string (str): The input text.
+
+    Returns:
+        str: The obscured text.
+    """
+    def combine(string_a, string_b):
+        string_c = ''
+        min_len = min(len(string_a), len(string_b))
+
+        for i in range(min_len):
+            string_c += string_a[i] + string_b[i]
+
+        return string_c + string_a[min_len:] + string_b[min_len:]
+
+    string = combine(string, bloc_c.get_random_charac_group_b())
+    string = combine(string, bloc_c.get_random_charac_group_b())
+    string = list(string)
+
+    for _ in range(randint(settings.mini_add_group_b_charac, settings.maxi_add_group_b_charac)):
+        string.insert(randint(0, len(string)), bloc_c.get_random_charac_group_b())
+
+    return ''.join(string)
+
+def time_call(function, *args, repeat=3):
+    """
+    Returns the best wall time of several calls.
+
+    Args:
+        function (callable): The function to time.
+        *args: Arguments passed to the function.
+        repeat (int): The number of calls.
+
+    Returns:
+        float: The best time in seconds.
+    """
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = perf_counter()
+        function(*args)
+        best = min(best, perf_counter() - start)
+
+    return best
+
+def bench_cipher(sizes=(100, 1000, 10000, 100000), repeat=3):
+    """
+    Compares the compiled translate table with the replace loop.
+
+    Args:
+        sizes (tuple): Message lengths to measure.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per size with both timings and the speedup.
+    """
+    seed(0)
+    results = []
+    key = bloc_b.key_list[0]
+    table = bloc_b.compile_key(key)
+
+    for size in sizes:
+        msg = ''.join(choice(settings.charac_sub) for _ in range(size))
+
+        assert msg.translate(table) == legacy_cipher(msg, key)
+
+        legacy = time_call(legacy_cipher, msg, key, repeat=repeat)
+        compiled = time_call(msg.translate, table, repeat=repeat)
+
+        results.append({
+            "size": size,
+            "legacy": legacy,
+            "compiled": compiled,
+            "speedup": legacy / compiled,
+        })
+
+    return results
+
+def bench_decipher(sizes=(100, 1000, 10000), repeat=3):
+    """
+    Compares the single-pass decoder with the replace loop.
+
+    Args:
+        sizes (tuple): Message lengths to measure.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per size with both timings and the speedup.
+    """
+    seed(0)
+    results = []
+    decoder = bloc_b.get_decoder()
+
+    for size in sizes:
+        msg = ''.join(choice(settings.charac_sub) for _ in range(size))
+        coded = bloc_b.cipher(msg)
+
+        assert bloc_b.decipher(coded) == legacy_decipher(coded, bloc_b.key_list) == msg
+
+        legacy = time_call(legacy_decipher, coded, bloc_b.key_list, repeat=repeat)
+        single_pass = time_call(bloc_b.decode, coded, decoder, repeat=repeat)
+
+        results.append({
+            "size": size,
+            "legacy": legacy,
+            "single_pass": single_pass,
+            "speedup": legacy / single_pass,
+        })
+
+    return results
+
+def bench_obscur(sizes=(1000, 10000, 100000, 1000000), repeat=3):
+    """
+    Compares the single-join noise engine with the legacy obscur.
+
+    Both outputs are checked to strip back to the input with `remove_group_charac_b`.
+
+    Args:
+        sizes (tuple): Text lengths to measure.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per size with both timings and the speedup.
+    """
+    seed(0)
+    results = []
+
+    for size in sizes:
+        text = ''.join(choice(settings.group_a) for _ in range(size))
+
+        assert bloc_c.remove_group_charac_b(bloc_c.obscur(text)) == text
+        assert bloc_c.remove_group_charac_b(legacy_obscur(text)) == text
+
+        legacy = time_call(legacy_obscur, text, repeat=repeat)
+        engine = time_call(bloc_c.obscur, text, repeat=repeat)
+
+        results.append({
+            "size": size,
+            "legacy": legacy,
+            "engine": engine,
+            "speedup": legacy / engine,
+        })
+
+    return results
+
+def bench_rng(sizes=(3, 30, 1000, 100000), repeat=3):
+    """
+    Compares buffered `rng` draws with one `random.choice` call per character.
+
+    Args:
+        sizes (tuple): Lengths of the group B strings to draw.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per size with both timings and the speedup.
+    """
+    group_b = settings.group_b
+    rng.seed(0)
+    results = []
+
+    def legacy(length):
+        return ''.join(choice(group_b) for _ in range(length))
+
+    for size in sizes:
+        number = max(1, 100000 // size)
+        per_character = time_call(lambda: [legacy(size) for _ in range(number)], repeat=repeat) / number
+        buffered = time_call(lambda: [rng.random_string(group_b, size) for _ in range(number)], repeat=repeat) / number
+
+        results.append({
+            "size": size,
+            "legacy": per_character,
+            "buffered": buffered,
+            "speedup": per_character / buffered,
+        })
+
+    rng.seed(None)
+    return results
+
+def bench_header(sizes=(100, 10000), repeat=3):
+    """
+    Compares header decryption with one key against the all-keys decoder, from a cold start.
+
+    Both timings include building the decoder they use, as a fresh process would.
+
+    Args:
+        sizes (tuple): Message lengths to measure.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per size with both timings and the speedup.
+    """
+    from MSE import mse_cipher, mse_decipher
+    from header import parse_header
+
+    seed(0)
+    results = []
+    key_list = bloc_b.get_key_list()
+
+    for size in sizes:
+        msg = ''.join(choice(settings.charac_sub) for _ in range(size))
+        coded = mse_cipher(msg, False, header=True)
+        index, _, length = parse_header(coded)
+        text = bloc_c.remove_group_charac_b(coded[length:])
+
+        assert mse_decipher(coded) == msg
+
+        all_keys = time_call(lambda: bloc_b.decode(text, bloc_b.build_decoder(key_list)), repeat=repeat)
+        one_key = time_call(lambda: bloc_b.decode(text, bloc_b.build_decoder([key_list[index]])), repeat=repeat)
+
+        results.append({
+            "size": size,
+            "all_keys": all_keys,
+            "one_key": one_key,
+            "speedup": all_keys / one_key,
+        })
+
+    return results
+
+def bench_reload(added=(1, 10, 100), repeat=3):
+    """
+    Compares extending the library decoder with appended keys against rebuilding it.
+
+    Args:
+        added (tuple): Numbers of appended keys to measure.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per number of keys with both timings and the speedup.
+    """
+    from key_generator import key_gen_bulk
+
+    seed(0)
+    results = []
+    key_list = list(bloc_b.get_key_list())
+    decoder = bloc_b.build_decoder(key_list)
+
+    for count in added:
+        keys = key_gen_bulk(count)
+        library = key_list + keys
+
+        assert bloc_b.extend_decoder(decoder, keys) == bloc_b.build_decoder(library)
+
+        rebuild = time_call(bloc_b.build_decoder, library, repeat=repeat)
+        extend = time_call(bloc_b.extend_decoder, decoder, keys, repeat=repeat)
+
+        results.append({
+            "added": count,
+            "rebuild": rebuild,
+            "extend": extend,
+            "speedup": rebuild / extend,
+        })
+
+    return results
+
+def bench_parallel_decipher(size=2000000, workers=(1, 2, 4, 8), chunk_size=1 << 18, repeat=3):
+    """
+    Times the parallel decipher of one large message for every pool size.
+
+    Pools are started and warmed up before timing, so the figures show how the
+    decoding itself scales; the single-process `mse_decipher` is the baseline.
+
+    Args:
+        size (int): The message length.
+        workers (tuple): The pool sizes to measure.
+        chunk_size (int): The number of characters decoded per task.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per pool size with the time and the speedup over `mse_decipher`.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from MSE import mse_cipher, mse_decipher, mse_decipher_parallel, warm_up
+
+    seed(0)
+    words = [''.join(choice(settings.charac_sub[:-1]) for _ in range(randint(1, 9))) for _ in range(500)]
+    msg = ' '.join(choice(words) for _ in range(size))[:size]
+    coded = mse_cipher(msg, False)
+    warm_up()
+
+    baseline = time_call(mse_decipher, coded, repeat=repeat)
+    results = [{"workers": 0, "seconds": baseline, "speedup": 1.0}]
+
+    for count in workers:
+        with ProcessPoolExecutor(count, initializer=warm_up) as executor:
+            assert mse_decipher_parallel(coded, chunk_size=chunk_size, executor=executor) == msg
+
+            seconds = time_call(lambda: mse_decipher_parallel(coded, chunk_size=chunk_size, executor=executor),
+                                repeat=repeat)
+
+        results.append({"workers": count, "seconds": seconds, "speedup": baseline / seconds})
+
+    return results
+
+def bench_packing(sizes=(1000, 100000, 1000000), repeat=3):
+    """
+    Measures the size and speed of the packed ciphertext encoding, with and without zlib.
+
+    Args:
+        sizes (tuple): Message lengths to measure.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per size with the UTF-8 and packed sizes and the pack/unpack times.
+    """
+    from MSE import mse_cipher
+    from packing import pack, unpack
+
+    seed(0)
+    results = []
+    words = [''.join(choice(settings.charac_sub[:-1]) for _ in range(randint(1, 9))) for _ in range(500)]
+
+    for size in sizes:
+        coded = mse_cipher(' '.join(choice(words) for _ in range(size))[:size], False)
+        row = {"size": size, "utf8_bytes": len(coded.encode("utf-8"))}
+
+        for name, compress in (("packed", False), ("zlib", True)):
+            packed = pack(coded, compress=compress)
+
+            assert unpack(packed) == coded
+
+            row[f"{name}_bytes"] = len(packed)
+            row[f"{name}_pack"] = time_call(pack, coded, None, compress, repeat=repeat)
+            row[f"{name}_unpack"] = time_call(unpack, packed, repeat=repeat)
+
+        results.append(row)
+
+    return results
+
+def peak_memory(function, *args):
+    """
+    Returns the peak memory allocated by a call, measured with `tracemalloc`.
+
+    Args:
+        function (callable): The function to measure.
+        *args: Arguments passed to the function.
+
+    Returns:
+        int: The peak allocation in bytes.
+    """
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_fused(sizes=(1000, 100000, 1000000), repeat=3):
+    """
+    Compares the peak memory and speed of the fused and staged encryption.
+
+    Args:
+        sizes (tuple): Message lengths to measure.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per size with both timings and peak allocations.
+    """
+    from MSE import mse_cipher, mse_decipher
+    from fused import fused_cipher
+
+    seed(0)
+    results = []
+    words = [''.join(choice(settings.charac_sub[:-1]) for _ in range(randint(1, 9))) for _ in range(500)]
+    bloc_b.get_decoder()
+
+    for size in sizes:
+        msg = ' '.join(choice(words) for _ in range(size))[:size]
+
+        assert mse_decipher(fused_cipher(msg)) == msg
+
+        staged = time_call(mse_cipher, msg, False, repeat=repeat)
+        fused = time_call(fused_cipher, msg, repeat=repeat)
+
+        results.append({
+            "size": size,
+            "staged": staged,
+            "fused": fused,
+            "staged_peak": peak_memory(mse_cipher, msg, False),
+            "fused_peak": peak_memory(fused_cipher, msg),
+        })
+
+    return results
+
+def bench_memory(sizes=(100000, 1000000), repeat=3):
+    """
+    Reports the peak allocation of every stage, and compares the peak memory and
+    speed of the chunked path with the whole-message path.
+
+    Args:
+        sizes (tuple): Message lengths to measure.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per size with the stage peaks and both timings and peak allocations.
+    """
+    from MSE import mse_cipher, mse_decipher, mse_cipher_chunks, mse_decipher_chunked
+    from instrument import memory_profile
+
+    seed(0)
+    results = []
+    words = [''.join(choice(settings.charac_sub[:-1]) for _ in range(randint(1, 9))) for _ in range(500)]
+    bloc_b.get_decoder()
+
+    def chunked_cipher(msg):
+        return ''.join(mse_cipher_chunks(msg))
+
+    for size in sizes:
+        msg = ' '.join(choice(words) for _ in range(size))[:size]
+
+        with memory_profile() as profile:
+            coded = mse_cipher(msg, False)
+            assert mse_decipher(coded) == msg
+
+        assert mse_decipher_chunked(chunked_cipher(msg)) == msg
+
+        results.append({
+            "size": size,
+            "stages": profile.peaks,
+            "cipher": time_call(mse_cipher, msg, False, repeat=repeat),
+            "chunked_cipher": time_call(chunked_cipher, msg, repeat=repeat),
+            "decipher": time_call(mse_decipher, coded, repeat=repeat),
+            "chunked_decipher": time_call(mse_decipher_chunked, coded, repeat=repeat),
+            "cipher_peak": peak_memory(mse_cipher, msg, False),
+            "chunked_cipher_peak": peak_memory(chunked_cipher, msg),
+            "decipher_peak": peak_memory(mse_decipher, coded),
+            "chunked_decipher_peak": peak_memory(mse_decipher_chunked, coded),
+        })
+
+    return results
+
+def bench_keystore(key_numbers=(1000, 10000), shard_size=1024, size=1000, repeat=3):
+    """
+    Compares decryption with a sharded key store against the all-keys decoder, from a cold start.
+
+    Both timings and peak allocations include what each path loads: the whole
+    decoder for the library, or the shards matching the first tokens.
+
+    Args:
+        key_numbers (tuple): Library sizes to measure.
+        shard_size (int): The number of keys per shard.
+        size (int): The message length.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per library size with both timings and peak allocations.
+    """
+    from keystore import KeyStore, generate_store, store_cipher, store_decipher
+
+    results = []
+    rng.seed(0)
+    msg = ''.join(Random(0).choice(settings.charac_sub) for _ in range(size))
+
+    for key_number in key_numbers:
+        with tempfile.TemporaryDirectory() as directory:
+            generate_store(directory, key_number, shard_size)
+            store = KeyStore(directory)
+            coded = bloc_c.remove_group_charac_b(store_cipher(msg, store))
+            keys = list(store)
+
+            def all_keys():
+                return bloc_b.decode(coded, bloc_b.build_decoder(keys))
+
+            def sharded():
+                bloc_b.key_decoder.cache_clear()
+                return KeyStore(directory).decipher(coded)
+
+            assert all_keys() == sharded()
+            assert store_decipher(store_cipher(msg, store, header=True), store) == msg
+
+            results.append({
+                "keys": key_number,
+                "all_keys": time_call(all_keys, repeat=repeat),
+                "sharded": time_call(sharded, repeat=repeat),
+                "all_keys_peak": peak_memory(all_keys),
+                "sharded_peak": peak_memory(sharded),
+            })
+
+    rng.seed(None)
+    return results
+
+def bench_remove_group_charac_b(sizes=(1000, 10000, 100000), db_sizes=(1000, 5000, 22000), repeat=3):
+    """
+    Compares the `str.translate` deletion table with the per-character scan of `group_b`.
+
+    Both the ciphertext length and the size of the character database grow, since
+    the old scan cost their product.
+
+    Args:
+        sizes (tuple): Ciphertext lengths to measure.
+        db_sizes (tuple): Group B sizes to measure.
+        repeat (int): The number of calls per measurement.
+
+    Returns:
+        list: One dict per (size, db_size) with both timings and the speedup.
+    """
+    seed(0)
+    results = []
+    group_a, full_group_b = settings.group_a, settings.group_b
+
+    for db_size in db_sizes:
+        group_b = full_group_b[:db_size]
+        table = dict.fromkeys(map(ord, group_b))
+
+        def legacy(code):
+            return ''.join(char for char in code if char not in group_b)
+
+        for size in sizes:
+            code = ''.join(choice(group_a) if n % 2 else choice(group_b) for n in range(size))
+
+            assert code.translate(table) == legacy(code)
+
+            scan = time_call(legacy, code, repeat=repeat)
+            translate = time_call(code.translate, table, repeat=repeat)
+
+            results.append({
+                "size": size,
+                "db_size": db_size,
+                "legacy": scan,
+                "translate": translate,
+                "speedup": scan / translate,
+            })
+
+    return results
+
+def bench_import_time(module="MSE", budget=IMPORT_BUDGET):
+    """
+    Measures the cold import time of a module with `python -X importtime`.
+
+    Importing MSE must not load the configuration, the character database or the
+    key library; this keeps short-lived processes cheap.
+
+    Args:
+        module (str): The module to import.
+        budget (int): The allowed cumulative import time, in microseconds.
+
+    Returns:
+        dict: The cumulative import time and whether it fits the budget.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    cumulative = 0
+
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative = int(fields[1])
+
+    return {"module": module, "cumulative": cumulative, "budget": budget, "ok": cumulative <= budget}
+
+def print_comparisons():
+    """
+    Prints every comparison against the previous implementations.
+    """
+    row = bench_import_time()
+    print(f"import {row['module']}: {row['cumulative']}us (budget {row['budget']}us) "
+          f"{'ok' if row['ok'] else 'OVER BUDGET'}")
+
+    print("cipher")
+    for row in bench_cipher():
+        print(f"  {row['size']:>6} chars  replace: {row['legacy']:.4f}s  "
+              f"translate: {row['compiled']:.4f}s  x{row['speedup']:.1f}")
+
+    print("obscur")
+    for row in bench_obscur():
+        print(f"  {row['size']:>7} chars  legacy: {row['legacy']:.4f}s  "
+              f"engine: {row['engine']:.4f}s  x{row['speedup']:.0f}")
+
+    print("group_b draws")
+    for row in bench_rng():
+        print(f"  {row['size']:>6} chars  choice: {row['legacy'] * 1e6:.2f}us  "
+              f"buffered: {row['buffered'] * 1e6:.2f}us  x{row['speedup']:.1f}")
+
+    print("fused cipher")
+    for row in bench_fused():
+        print(f"  {row['size']:>7} chars  staged: {row['staged']:.4f}s {row['staged_peak'] / 1e6:.1f}MB  "
+              f"fused: {row['fused']:.4f}s {row['fused_peak'] / 1e6:.1f}MB")
+
+    print("packing")
+    for row in bench_packing():
+        print(f"  {row['size']:>7} chars  utf-8: {row['utf8_bytes']}B  "
+              f"packed: {row['packed_bytes']}B x{row['utf8_bytes'] / row['packed_bytes']:.1f} "
+              f"({row['packed_pack']:.4f}s/{row['packed_unpack']:.4f}s)  "
+              f"zlib: {row['zlib_bytes']}B x{row['utf8_bytes'] / row['zlib_bytes']:.0f} "
+              f"({row['zlib_pack']:.4f}s/{row['zlib_unpack']:.4f}s)")
+
+    print("memory (stage peaks, then whole-message and chunked paths)")
+    for row in bench_memory():
+        print(f"  {row['size']:>7} chars  " + "  ".join(f"{stage}: {peak / 1e6:.1f}MB"
+                                                      for stage, peak in row["stages"].items()))
+        for name in ("cipher", "decipher"):
+            print(f"  {row['size']:>7} chars  {name}: {row[name]:.4f}s {row[name + '_peak'] / 1e6:.1f}MB  "
+                  f"chunked: {row['chunked_' + name]:.4f}s {row['chunked_' + name + '_peak'] / 1e6:.1f}MB")
+
+    print(f"header decipher ({len(bloc_b.key_list)} keys, decoder build included)")
+    for row in bench_header():
+        print(f"  {row['size']:>6} chars  all keys: {row['all_keys']:.4f}s  "
+              f"one key: {row['one_key']:.4f}s  x{row['speedup']:.0f}")
+
+    print(f"key library reload ({len(bloc_b.key_list)} keys)")
+    for row in bench_reload():
+        print(f"  {row['added']:>6} keys added  rebuild: {row['rebuild']:.4f}s  "
+              f"extend: {row['extend']:.4f}s  x{row['speedup']:.1f}")
+
+    print("key store (1000-char message, decoder build and shard loads included)")
+    for row in bench_keystore():
+        print(f"  {row['keys']:>6} keys  all keys: {row['all_keys']:.4f}s {row['all_keys_peak'] / 1e6:.1f}MB  "
+              f"sharded: {row['sharded']:.4f}s {row['sharded_peak'] / 1e6:.1f}MB")
+
+    print("remove_group_charac_b")
+    for row in bench_remove_group_charac_b():
+        print(f"  {row['size']:>6} chars  group_b {row['db_size']:>6}  scan: {row['legacy']:.4f}s  "
+              f"translate: {row['translate']:.4f}s  x{row['speedup']:.0f}")
+
+    build = time_call(bloc_b.build_decoder, bloc_b.key_list, repeat=1)
+    print(f"decipher ({len(bloc_b.key_list)} keys, decoder built in {build:.3f}s)")
+    for row in bench_decipher():
+        print(f"  {row['size']:>6} chars  replace: {row['legacy']:.4f}s  "
+              f"single pass: {row['single_pass']:.4f}s  x{row['speedup']:.0f}")
+
+def make_workspace(directory, key_number, db_size, seed_value=0):
+    """
+    Writes a fixed `setting.json` and a seeded character database into `directory`.
+
+    The database holds `db_size` distinct printable characters outside `charac_sub`,
+    drawn from the supplementary ideographic plane with a seeded RNG.
+
+    Args:
+        directory (str): The workspace directory.
+        key_number (int): The number of keys in the library.
+        db_size (int): The number of characters in the database.
+        seed_value (int): The RNG seed.
+    """
+    os.makedirs(os.path.join(directory, "configs"), exist_ok=True)
+    characs = Random(seed_value).sample(range(0x20000, 0x20000 + 2 * db_size), db_size)
+
+    with open(os.path.join(directory, "configs", "bench.txt"), "w", encoding="utf-8") as file:
+        file.write("".join(map(chr, characs)))
+
+    config = dict(SUITE_SETTINGS, substitue_with="configs/bench.txt", key_number=[0, key_number])
+
+    with open(os.path.join(directory, "configs", "setting.json"), "w", encoding="utf-8") as file:
+        json.dump(config, file, indent=4)
+
+def bench_stages(message_sizes=SUITE_MESSAGE_SIZES, key_number=0, repeat=3, seed_value=0):
+    """
+    Times every pipeline stage in the current workspace.
+
+    Args:
+        message_sizes (tuple): Message lengths to measure.
+        key_number (int): The number of keys to generate.
+        repeat (int): The number of calls per measurement.
+        seed_value (int): The RNG seed used for messages and noise.
+
+    Returns:
+        list: One dict per (stage, message size) with the best time.
+    """
+    from bloc_a import complexify, decomplexify
+    from key_generator import key_lib_generator
+    from MSE import mse_cipher, mse_decipher
+
+    seed(seed_value)
+    rng.seed(seed_value)
+    results = [{"stage": "key_lib_generator", "size": key_number,
+                "seconds": time_call(key_lib_generator, 0, key_number, repeat=1)}]
+    results.append({"stage": "build_decoder", "size": key_number,
+                    "seconds": time_call(bloc_b.build_decoder, bloc_b.get_key_list(), repeat=1)})
+    words = [''.join(choice(settings.charac_sub[:-1]) for _ in range(randint(1, 9))) for _ in range(500)]
+
+    for size in message_sizes:
+        msg = ' '.join(choice(words) for _ in range(size))[:size]
+        a = complexify(msg)
+        b = bloc_b.cipher(a)
+        c = bloc_c.obscur(b)
+        coded = mse_cipher(msg, False)
+
+        assert mse_decipher(coded) == msg
+
+        stages = [
+            ("complexify", complexify, msg), ("decomplexify", decomplexify, a),
+            ("cipher", bloc_b.cipher, a), ("decipher", bloc_b.decipher, b),
+            ("obscur", bloc_c.obscur, b), ("remove_group_charac_b", bloc_c.remove_group_charac_b, c),
+            ("mse_cipher", lambda m: mse_cipher(m, False), msg), ("mse_decipher", mse_decipher, coded),
+        ]
+
+        for stage, function, argument in stages:
+            results.append({"stage": stage, "size": size, "seconds": time_call(function, argument, repeat=repeat)})
+
+    return results
+
+def run_suite(message_sizes=SUITE_MESSAGE_SIZES, key_numbers=SUITE_KEY_NUMBERS, db_sizes=SUITE_DB_SIZES,
+              repeat=3, seed_value=0):
+    """
+    Runs `bench_stages` for every key library size and character database size.
+
+    Each combination runs in a fresh process inside its own temporary workspace,
+    so no configuration, key library or cache leaks from one run to the next.
+
+    Args:
+        message_sizes (tuple): Message lengths to measure.
+        key_numbers (tuple): Key library sizes to measure.
+        db_sizes (tuple): Character database sizes to measure.
+        repeat (int): The number of calls per measurement.
+        seed_value (int): The RNG seed.
+
+    Returns:
+        dict: The suite parameters and one result row per measurement.
+    """
+    rows = []
+
+    for key_number in key_numbers:
+        for db_size in db_sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                make_workspace(directory, key_number, db_size, seed_value)
+                params = {"message_sizes": list(message_sizes), "key_number": key_number,
+                          "repeat": repeat, "seed": seed_value}
+                result = subprocess.run([sys.executable, os.path.abspath(__file__), "worker", json.dumps(params)],
+                                        cwd=directory, capture_output=True, text=True, check=True)
+
+            for row in json.loads(result.stdout):
+                rows.append(dict(row, key_number=key_number, db_size=db_size))
+
+    return {
+        "python": sys.version.split()[0],
+        "seed": seed_value,
+        "settings": SUITE_SETTINGS,
+        "results": rows,
+    }
+
+def find_regressions(previous, current, threshold=1.2):
+    """
+    Lists the measurements that got slower than `threshold` times their previous value.
+
+    Args:
+        previous (dict): An earlier `run_suite` result.
+        current (dict): The new `run_suite` result.
+        threshold (float): The allowed slowdown ratio.
+
+    Returns:
+        list: One dict per regression with both timings and the ratio.
+    """
+    def key(row):
+        return row["stage"], row["size"], row["key_number"], row["db_size"]
+
+    before = {key(row): row["seconds"] for row in previous["results"]}
+    regressions = []
+
+    for row in current["results"]:
+        old = before.get(key(row))
+        if old and row["seconds"] > old * threshold:
+            regressions.append(dict(row, previous=old, ratio=row["seconds"] / old))
+
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MSE benchmarks")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("compare", help="compare stages with their previous implementations")
+    suite = commands.add_parser("suite", help="time every stage across sizes and write JSON")
+    suite.add_argument("--output", default="benchmark.json")
+    suite.add_argument("--baseline", help="previous JSON results to compare against")
+    suite.add_argument("--threshold", type=float, default=1.2)
+    suite.add_argument("--message-sizes", type=int, nargs="+", default=SUITE_MESSAGE_SIZES)
+    suite.add_argument("--key-numbers", type=int, nargs="+", default=SUITE_KEY_NUMBERS)
+    suite.add_argument("--db-sizes", type=int, nargs="+", default=SUITE_DB_SIZES)
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.add_argument("--seed", type=int, default=0)
+    scaling = commands.add_parser("scaling", help="time the parallel decipher over pool sizes")
+    scaling.add_argument("--size", type=int, default=2000000)
+    scaling.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    scaling.add_argument("--chunk-size", type=int, default=1 << 18)
+    scaling.add_argument("--repeat", type=int, default=3)
+    import_time = commands.add_parser("import-time", help="check the cold import time of MSE against its budget")
+    import_time.add_argument("--module", default="MSE")
+    import_time.add_argument("--budget", type=int, default=IMPORT_BUDGET)
+    worker = commands.add_parser("worker")
+    worker.add_argument("params")
+    args = parser.parse_args()
+
+    if args.command == "suite":
+        report = run_suite(args.message_sizes, args.key_numbers, args.db_sizes, args.repeat, args.seed)
+
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"{len(report['results'])} measurements written to {args.output}")
+
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as file:
+                regressions = find_regressions(json.load(file), report, args.threshold)
+
+            for row in regressions:
+                print(f"REGRESSION {row['stage']} size={row['size']} keys={row['key_number']} "
+                      f"db={row['db_size']}: {row['previous']:.4f}s -> {row['seconds']:.4f}s (x{row['ratio']:.2f})")
+            sys.exit(1 if regressions else 0)
+    elif args.command == "scaling":
+        print(f"parallel decipher, {args.size} chars, {os.cpu_count()} CPUs")
+        for row in bench_parallel_decipher(args.size, args.workers, args.chunk_size, args.repeat):
+            label = f"{row['workers']} workers" if row["workers"] else "mse_decipher"
+            print(f"  {label:>12}  {row['seconds']:.3f}s  x{row['speedup']:.2f}")
+    elif args.command == "import-time":
+        row = bench_import_time(args.module, args.budget)
+        print(f"import {row['module']}: {row['cumulative']}us (budget {row['budget']}us) "
+              f"{'ok' if row['ok'] else 'OVER BUDGET'}")
+        sys.exit(0 if row["ok"] else 1)
+    elif args.command == "worker":
+        params = json.loads(args.params)
+        print(json.dumps(bench_stages(params["message_sizes"], params["key_number"], params["repeat"], params["seed"])))
+    else:
+        print_comparisons()
@@ -7,27 +7,132 @@ Description: Handles character substitution for encryption and decryption.
 
 Functions:
 - cipher(plain_text): Substitutes characters in the input text using a randomly chosen key.
-- decipher(coded_msg): Restores the original text by reversing the substitution process.
+- decipher(coded_msg, snapshot): Restores the original text by reversing the substitution process.
+- cipher_with_key(plain_text, index, snapshot): Substitutes characters using a given key of the library.
+- decipher_with_key(coded_msg, index, snapshot): Restores a text substituted with a known key of the library.
+- parse_key(key): Splits a key line into its substitution tokens.
+- key_table(key, charac_sub): Builds the `str.translate` table of a key line.
+- compile_key(key): Returns the cached `key_table` of a key line for the default configuration.
+- build_decoder(keys, charac_sub): Indexes every token of every key for single-pass decoding.
+- extend_decoder(decoder, keys, charac_sub): Returns a copy of a decoder with the tokens of more keys.
+- decode(coded_msg, decoder): Maps tokens back to plain characters in one linear scan.
+- decode_prefix(coded_msg, stop, decoder): Decodes the tokens starting before a position, for chunked decoding.
+- decode_span(coded_msg, start, end, overlap, decoder): Decodes one span of a text for parallel decoding.
+- stitch_spans(spans, redecode): Joins consecutive decoded spans into the output of one scan.
+- get_snapshot(): Returns the current key library snapshot, loading the library on first use.
+- get_key_list(): Returns the key library, generating or converting it on first use.
+- get_decoder(): Returns the decoder for the loaded key library, building it on first use.
+- key_decoder(key): Returns the cached decoder of a single key line.
+- check_keys(keys): Checks that key lines have one token per substituted character.
+- append_keys(keys): Appends keys to the library file and the loaded snapshot.
+- replace_keys(keys): Replaces the library file and the loaded snapshot.
+- reload_key_list(path): Loads the library file again, extending the decoder when keys were only appended.
+- watch_key_list(interval): Reloads the library whenever its file changes, from a background thread.
+
+Classes:
+- KeySnapshot(keys, decoder): A key library with its decoder and fingerprint, swapped as a whole.
+
+The library, its decoder and its fingerprint live in a `KeySnapshot`. Reloading
+or extending the library builds a new snapshot and swaps it in with a single
+assignment, so a call that took a snapshot keeps a consistent view until it ends.
 
 Dependencies:
-- Requires `keylib.txt` or generates it using the `key_lib_generator`.
+- Requires `keylib.bin`, converts a legacy `keylib.txt`, or generates it using the `key_lib_generator`.
 
 
 """
 
-from configs.configs_setting import key_number, len_charac_sub, charac_sub
-from random import choice
+from configs import configs_setting as settings
+import rng
+from functools import lru_cache
+from keylib import KeyLibrary, convert_text_keylib, write_keylib, KEYLIB_PATH, TEXT_KEYLIB_PATH
 import os
+import threading
+
+# Number of compiled cipher tables kept in memory
+KEY_CACHE_SIZE = 5000
+
+class KeySnapshot:
+    """
+    A key library with its decoder and fingerprint, swapped as a whole.
+
+    The keys of a snapshot never change; the decoder and the fingerprint are
+    built on first use.
+    """
+
+    def __init__(self, keys, decoder=None):
+        self.keys = keys
+        self._decoder = decoder
+        self._fingerprint = None
+        self._lock = threading.Lock()
+
+    @property
+    def decoder(self):
+        """
+        The decoder of every key of the snapshot.
+        """
+        if self._decoder is None:
+            with self._lock:
+                if self._decoder is None:
+                    self._decoder = build_decoder(self.keys)
+
+        return self._decoder
+
+    @property
+    def fingerprint(self):
+        """
+        The fingerprint of the configuration and keys (see `header.fingerprint`).
+        """
+        if self._fingerprint is None:
+            from header import fingerprint
+            self._fingerprint = fingerprint(self.keys)
+
+        return self._fingerprint
+
+_snapshot = None
+_snapshot_lock = threading.RLock()
 
-# Ensure key library exists or generate it
-if os.path.exists("keylib.txt"):
-    with open('keylib.txt', 'r', encoding="utf-8") as key_file:
-        key_list = key_file.readlines()
-else:
-    from key_generator import key_lib_generator
-    key_lib_generator(key_number[0], key_number[1])
-    with open('keylib.txt', 'r', encoding="utf-8") as key_file:
-        key_list = key_file.readlines()
+def get_snapshot():
+    """
+    Returns the current key library snapshot, loading the library on first use.
+
+    Returns:
+        KeySnapshot: The current snapshot.
+    """
+    global _snapshot
+
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                # Ensure key library exists or generate it
+                if not os.path.exists(KEYLIB_PATH):
+                    if os.path.exists(TEXT_KEYLIB_PATH):
+                        convert_text_keylib(TEXT_KEYLIB_PATH, KEYLIB_PATH)
+                    else:
+                        from key_generator import key_lib_generator
+                        key_lib_generator(settings.key_number[0], settings.key_number[1])
+
+                _snapshot = KeySnapshot(KeyLibrary(KEYLIB_PATH))
+
+    return _snapshot
+
+def get_key_list():
+    """
+    Returns the key library, generating or converting it on first use.
+
+    Returns:
+        KeyLibrary: The loaded key library.
+    """
+    return get_snapshot().keys
+
+def __getattr__(name):
+    """
+    Keeps `bloc_b.key_list` available while loading the library lazily.
+    """
+    if name == "key_list":
+        return get_key_list()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def cipher(plain_text):
     """
@@ -42,19 +147,301 @@ def cipher(plain_text):
     if not isinstance(plain_text, str):
         raise ValueError("Input must be a string.")
 
-    key = choice(key_list).strip().split(' ')
+    return plain_text.translate(compile_key(rng.choice(get_key_list())))
+
+def cipher_with_key(plain_text, index, snapshot=None):
+    """
+    Encrypts the input text with a given key of the library.
+
+    Args:
+        plain_text (str): The text to be encrypted.
+        index (int): The index of the key in the library.
+        snapshot (KeySnapshot): The library to use (default: the current one).
+
+    Returns:
+        str: The encrypted text.
+    """
+    if not isinstance(plain_text, str):
+        raise ValueError("Input must be a string.")
+
+    return plain_text.translate(compile_key((snapshot or get_snapshot()).keys[index]))
+
+def parse_key(key):
+    """
+    Splits a key line into its substitution tokens.
+
+    Args:
+        key (str): A line from the key library.
+
+    Returns:
+        list: The tokens of the key, in `charac_sub` order.
+    """
+    return key.strip().split(' ')
+
+def key_table(key, charac_sub):
+    """
+    Builds the `str.translate` table of a key line.
+
+    The table substitutes every character in a single pass, so a token is never
+    rewritten by a later substitution.
+
+    Args:
+        key (str): A line from the key library.
+        charac_sub (str): The substituted characters.
+
+    Returns:
+        dict: A mapping from character ordinals to their tokens.
+    """
+    key = parse_key(key)
+    return {ord(charac_sub[c]): key[c] for c in range(len(charac_sub))}
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def compile_key(key):
+    """
+    Returns the `key_table` of a key line for the default configuration, cached per key line.
+
+    Args:
+        key (str): A line from the key library.
+
+    Returns:
+        dict: A mapping from character ordinals to their tokens.
+    """
+    return key_table(key, settings.charac_sub)
+
+def build_decoder(keys, charac_sub=None):
+    """
+    Indexes every token of every key so a message can be decoded in one scan.
+
+    Tokens are stored in a single hash table bucketed by length. When two keys
+    share a token, the first key wins, as it did with the chained replaces.
+
+    Args:
+        keys (iterable): Key library lines.
+        charac_sub (str): The substituted characters (default: from the default configuration).
+
+    Returns:
+        tuple: The token table and the token lengths, longest first.
+    """
+    return extend_decoder(({}, ()), keys, charac_sub)
+
+def extend_decoder(decoder, keys, charac_sub=None):
+    """
+    Returns a copy of a decoder that also holds the tokens of more keys.
+
+    Only the new keys are parsed; tokens already in the decoder keep their
+    character, as if the new keys came last in the library. The given decoder
+    is left unchanged, so calls still using it are not affected.
+
+    Args:
+        decoder (tuple): A decoder built by `build_decoder`.
+        keys (iterable): The key lines to add.
+        charac_sub (str): The substituted characters (default: from the default configuration).
+
+    Returns:
+        tuple: The extended token table and token lengths, longest first.
+    """
+    table, lengths = dict(decoder[0]), set(decoder[1])
+    charac_sub = charac_sub or settings.charac_sub
+
+    for key in keys:
+        key = parse_key(key)
+
+        for n in range(len(charac_sub)):
+            table.setdefault(key[n], charac_sub[n])
+            lengths.add(len(key[n]))
+
+    return table, tuple(sorted(lengths, reverse=True))
+
+def _scan(coded_msg, i, stop, table, lengths, append):
+    """
+    Decodes tokens from position i until reaching `stop`, and returns the position reached.
+    """
+    get = table.get
+    end = len(coded_msg)
+
+    while i < stop and i < end:
+        for length in lengths:
+            charac = get(coded_msg[i:i + length])
+            if charac is not None:
+                append(charac)
+                i += length
+                break
+        else:
+            append(coded_msg[i])
+            i += 1
+
+    return i
+
+def decode(coded_msg, decoder):
+    """
+    Maps tokens back to plain characters in one left-to-right scan.
+
+    At each position the longest known token wins; characters that do not
+    start a token are copied unchanged.
+
+    Args:
+        coded_msg (str): The text to be decoded.
+        decoder (tuple): A decoder built by `build_decoder`.
+
+    Returns:
+        str: The decoded text.
+    """
+    table, lengths = decoder
+    plain = []
+    _scan(coded_msg, 0, len(coded_msg), table, lengths, plain.append)
+
+    return ''.join(plain)
+
+def decode_prefix(coded_msg, stop, decoder):
+    """
+    Decodes the tokens of a text that start before `stop`.
+
+    With `stop` at least the longest token length before the end of the text,
+    every token is matched as in a scan of the whole text, so the rest of the
+    text can be carried over to the next chunk.
+
+    Args:
+        coded_msg (str): The text to be decoded.
+        stop (int): The position where no new token starts.
+        decoder (tuple): A decoder built by `build_decoder`.
+
+    Returns:
+        tuple: The decoded text and the position where the scan stopped.
+    """
+    table, lengths = decoder
+    plain = []
+    position = _scan(coded_msg, 0, stop, table, lengths, plain.append)
+
+    return ''.join(plain), position
+
+def decode_span(coded_msg, start, end, overlap, decoder):
+    """
+    Decodes the part of a text starting at `start`, for stitching with neighbouring spans.
+
+    The scan starts at `start`, which may fall inside a token, and goes on past
+    `end` for up to `overlap` characters. The positions reached in the first and
+    last `overlap` characters are recorded with the length of the output at that
+    point, so `stitch_spans` can find where consecutive scans meet.
+
+    Args:
+        coded_msg (str): The text to be decoded.
+        start (int): The position where the scan starts.
+        end (int): The position where the span ends.
+        overlap (int): The number of characters recorded at both ends.
+        decoder (tuple): A decoder built by `build_decoder`.
+
+    Returns:
+        tuple: The decoded text, a dict of head positions to output lengths, and a
+            list of (position, output length) pairs from `end` on.
+    """
+    table, lengths = decoder
+    plain = []
+    append = plain.append
+    head, tail = {}, []
+    i = start
+
+    while i < min(start + overlap, end):
+        head[i] = len(plain)
+        i = _scan(coded_msg, i, i + 1, table, lengths, append)
 
-    for c in range(len_charac_sub):
-        plain_text = plain_text.replace(charac_sub[c], key[c])
+    i = _scan(coded_msg, i, end, table, lengths, append)
 
-    return plain_text
+    while True:
+        tail.append((i, len(plain)))
+        if i >= min(end + overlap, len(coded_msg)):
+            break
+        i = _scan(coded_msg, i, i + 1, table, lengths, append)
 
-def decipher(coded_msg):
+    return ''.join(plain), head, tail
+
+def stitch_spans(spans, redecode):
+    """
+    Joins the outputs of consecutive `decode_span` scans into the output of one scan.
+
+    A scan from a given position always continues the same way, so the output of
+    a span is kept up to the first position also reached by the next scan, and
+    the next output is taken from there. When the two scans do not meet within
+    the overlap, the next span is decoded again from where this one stopped.
+
+    Args:
+        spans (list): (start, end, decode_span result) for consecutive spans covering the text.
+        redecode (callable): Takes a start and an end position and returns the
+            `decode_span` result of that span.
+
+    Returns:
+        str: The decoded text, as produced by `decode`.
+    """
+    pieces = []
+    skip = 0
+
+    for n, (_, _, (plain, _, tail)) in enumerate(spans):
+        if n + 1 == len(spans):
+            pieces.append(plain[skip:])
+            break
+
+        _, next_end, next_span = spans[n + 1]
+        next_head = next_span[1]
+
+        for position, length in tail:
+            if position in next_head:
+                break
+        else:
+            # The scans did not meet: decode the next span again from the last position
+            position, length = tail[-1]
+            spans[n + 1] = (position, next_end, redecode(position, next_end))
+            next_head = spans[n + 1][2][1]
+
+        pieces.append(plain[skip:length])
+        skip = next_head.get(position, 0)
+
+    return ''.join(pieces)
+
+def get_decoder():
+    """
+    Returns the decoder for the loaded key library, building it on first use.
+
+    Returns:
+        tuple: The decoder built by `build_decoder`.
+    """
+    return get_snapshot().decoder
+
+def decipher(coded_msg, snapshot=None):
     """
     Decrypts the input text by reversing the substitution process.
 
     Args:
         coded_msg (str): The text to be decrypted.
+        snapshot (KeySnapshot): The library to use (default: the current one).
+
+    Returns:
+        str: The original text.
+    """
+    if not isinstance(coded_msg, str):
+        raise ValueError("Input must be a string.")
+
+    return decode(coded_msg, (snapshot or get_snapshot()).decoder)
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def key_decoder(key):
+    """
+    Returns the decoder of a single key line, cached per key line.
+
+    Args:
+        key (str): A line from the key library.
+
+    Returns:
+        tuple: The decoder built by `build_decoder`.
+    """
+    return build_decoder([key])
+
+def decipher_with_key(coded_msg, index, snapshot=None):
+    """
+    Decrypts a text substituted with a known key, without building the library decoder.
+
+    Args:
+        coded_msg (str): The text to be decrypted.
+        index (int): The index of the key in the library.
+        snapshot (KeySnapshot): The library to use (default: the current one).
 
     Returns:
         str: The original text.
@@ -62,13 +449,145 @@ def decipher(coded_msg):
     if not isinstance(coded_msg, str):
         raise ValueError("Input must be a string.")
 
-    for key in key_list:
-        key = key.strip().split(' ')
+    return decode(coded_msg, key_decoder((snapshot or get_snapshot()).keys[index]))
 
-        for n in range(len_charac_sub):
-            coded_msg = coded_msg.replace(key[n], charac_sub[n])
+def _swap(keys, decoder):
+    global _snapshot
+    _snapshot = KeySnapshot(keys, decoder)
+    return _snapshot
 
-    return coded_msg
+def check_keys(keys):
+    """
+    Checks that key lines have the token layout of `key_gen`: one token per
+    substituted character, plus one before each special character.
+
+    Args:
+        keys (iterable): The key lines to check.
+
+    Returns:
+        list: The stripped, non-empty key lines.
+    """
+    expected = len(settings.charac_sub) + sum(charac in settings.special_charac for charac in settings.charac_sub)
+    checked = []
+
+    for key in keys:
+        key = key.strip()
+        if not key:
+            continue
+
+        count = len(parse_key(key))
+        if count != expected:
+            raise ValueError(f"Key {len(checked)} has {count} tokens instead of {expected}.")
+
+        checked.append(key)
+
+    return checked
+
+def append_keys(keys):
+    """
+    Appends keys to the library file and swaps in a snapshot holding them.
+
+    Every key is checked, and the decoder extended, before the file is touched,
+    so a bad key leaves the library as it was. The file is rewritten atomically
+    with the existing keys copied as they are. If the current decoder was built,
+    it is extended with the new keys only. Only one process should write a given
+    library at a time.
+
+    Args:
+        keys (iterable): The key lines to append.
+
+    Returns:
+        KeySnapshot: The new snapshot.
+    """
+    keys = check_keys(keys)
+
+    with _snapshot_lock:
+        current = get_snapshot()
+        decoder = current._decoder and extend_decoder(current._decoder, keys)
+        write_keylib(current.keys.path, keys, base=current.keys)
+
+        return _swap(KeyLibrary(current.keys.path), decoder)
+
+def replace_keys(keys):
+    """
+    Replaces the library file with new keys and swaps in a snapshot holding them.
+
+    Every key is checked before the file is touched.
+
+    Args:
+        keys (iterable): The key lines of the new library.
+
+    Returns:
+        KeySnapshot: The new snapshot.
+    """
+    keys = check_keys(keys)
+
+    if not keys:
+        raise ValueError("The key library needs at least one key.")
+
+    with _snapshot_lock:
+        path = get_snapshot().keys.path
+        write_keylib(path, keys)
+
+        return reload_key_list(path)
+
+def reload_key_list(path=None):
+    """
+    Loads the library file again and swaps in a snapshot of it.
+
+    When the new file starts with every key of the current library, the current
+    decoder is extended with the added keys; otherwise, if a decoder was in use,
+    a new one is built before the swap so calls never wait for it.
+
+    Args:
+        path (str): The library file (default: the file of the current snapshot).
+
+    Returns:
+        KeySnapshot: The new snapshot.
+    """
+    with _snapshot_lock:
+        current = get_snapshot()
+        keys = KeyLibrary(path or current.keys.path)
+        decoder = None
+
+        if current._decoder is not None:
+            if keys.starts_with(current.keys):
+                added = (keys[index] for index in range(len(current.keys), len(keys)))
+                decoder = extend_decoder(current._decoder, added)
+            else:
+                decoder = build_decoder(keys)
+
+        return _swap(keys, decoder)
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+def watch_key_list(interval=1.0):
+    """
+    Reloads the key library whenever its file changes, from a daemon thread.
+
+    The file is polled every `interval` seconds and compared with the file the
+    current snapshot was loaded from. A file that cannot be loaded (for instance
+    one written in place by another tool) is retried at the next poll.
+
+    Args:
+        interval (float): The polling interval in seconds.
+
+    Returns:
+        threading.Event: Set it to stop watching.
+    """
+    stop = threading.Event()
 
+    def watch():
+        while not stop.wait(interval):
+            keys = get_snapshot().keys
 
+            try:
+                if _file_signature(keys.path) != keys.signature:
+                    reload_key_list(keys.path)
+            except Exception:
+                continue
 
+    threading.Thread(target=watch, name="keylib-watcher", daemon=True).start()
+    return stop
@@ -6,31 +6,57 @@ Module: Block C
 Description: Performs advanced transformations on text after substitution.
 
 Functions:
-- get_random_charac_group_b(): Generates a random string from group_b characters.
+- get_random_charac_group_b(config): Generates a random string from group_b characters.
+- get_random_characs_group_b(count, config): Generates several random group_b strings from one draw.
 - combine_charac_a(string_a, string_b): Merges two strings by alternating their characters.
-- combine_charac_b(string_a): Combines a string with random characters from group_b.
-- combine_charac_c(plain_text, x): Randomly inserts characters from group_b into the text x times.
-- obscur(string): Applies multiple transformations to obscure the text.
-- remove_group_charac_b(code): Removes all characters from group_b in the given text.
+- combine_charac_b(string_a, config): Combines a string with random characters from group_b.
+- combine_charac_c(plain_text, x, config): Randomly inserts characters from group_b into the text x times.
+- scatter_charac_b(head, text, start, x, config): Inserts x random group_b strings into `head + text[start:]` in one join.
+- obscur(string, config): Applies multiple transformations to obscure the text.
+- remove_group_charac_b(code, config): Removes all characters from group_b in the given text.
 
 Dependencies:
-- Uses configurations from `configs_setting`.
+- Uses configurations from `configs_setting`. Every `config` argument takes settings
+  returned by `load_settings` and defaults to the default configuration.
+- Draws noise and positions from the `rng` provider.
 
 
 """
 
-from configs.configs_setting import len_charac_group_b, group_b, mini_add_group_b_charac, maxi_add_group_b_charac
-from random import choice, randint
+from configs import configs_setting as settings
+import rng
+from operator import add
 
-def get_random_charac_group_b():
+def get_random_charac_group_b(config=None):
     """
     Generates a random string using characters from group_b.
 
+    Args:
+        config (dict): The settings to use.
+
     Returns:
         str: A random string of characters from group_b.
     """
-    mini, maxi = len_charac_group_b[0], len_charac_group_b[1]
-    return ''.join(choice(group_b) for _ in range(mini, maxi))
+    config = config or settings.load_settings()
+    group_b = config["group_b"]
+    mini, maxi = config["len_charac_group_b"][0], config["len_charac_group_b"][1]
+    return rng.random_string(group_b, maxi - mini)
+
+def get_random_characs_group_b(count, config=None):
+    """
+    Generates several random strings of group_b characters from one buffered draw.
+
+    Args:
+        count (int): The number of strings.
+        config (dict): The settings to use.
+
+    Returns:
+        list: `count` strings, each as long as a `get_random_charac_group_b` string.
+    """
+    config = config or settings.load_settings()
+    length = config["len_charac_group_b"][1] - config["len_charac_group_b"][0]
+    characs = rng.random_string(config["group_b"], count * length)
+    return [characs[n * length:(n + 1) * length] for n in range(count)]
 
 def combine_charac_a(string_a, string_b):
     """
@@ -43,77 +69,114 @@ def combine_charac_a(string_a, string_b):
     Returns:
         str: The merged string.
     """
-    string_c = ''
     min_len = min(len(string_a), len(string_b))
+    merged = ''.join(map(add, string_a[:min_len], string_b[:min_len]))
 
-    for i in range(min_len):
-        string_c += string_a[i] + string_b[i]
-
-    if len(string_a) > len(string_b):
-        string_c += string_a[min_len:]
-    elif len(string_b) > len(string_a):
-        string_c += string_b[min_len:]
+    return merged + string_a[min_len:] + string_b[min_len:]
 
-    return string_c
-
-def combine_charac_b(string_a):
+def combine_charac_b(string_a, config=None):
     """
     Combines a string with random characters from group_b.
 
     Args:
         string_a (str): The input string.
+        config (dict): The settings to use.
 
     Returns:
         str: The combined string.
     """
-    string_b = get_random_charac_group_b()
+    string_b = get_random_charac_group_b(config)
     return combine_charac_a(string_a, string_b)
 
-def combine_charac_c(plain_text, x):
+def combine_charac_c(plain_text, x, config=None):
     """
     Randomly inserts characters from group_b into the text x times.
 
     Args:
         plain_text (str): The input text.
         x (int): The number of characters to insert.
+        config (dict): The settings to use.
 
     Returns:
         str: The modified text.
     """
-    plain_text = list(plain_text)
+    return scatter_charac_b('', plain_text, 0, x, config)
 
-    for _ in range(x):
-        position = randint(0, len(plain_text))
-        plain_text.insert(position, get_random_charac_group_b())
+def scatter_charac_b(head, text, start, x, config=None):
+    """
+    Inserts x random group_b strings into `head + text[start:]`, assembled in one join.
 
-    return ''.join(plain_text)
+    All final positions are drawn up front as a sorted sample, which gives the same
+    distribution as x successive inserts at uniformly random positions, without
+    building the concatenated text or shifting a list on every insert.
 
-def obscur(string):
+    Args:
+        head (str): The beginning of the text.
+        text (str): The string holding the rest of the text.
+        start (int): The index in `text` where the rest of the text begins.
+        x (int): The number of strings to insert.
+        config (dict): The settings to use.
+
+    Returns:
+        str: The modified text.
+    """
+    len_head = len(head)
+    length = len_head + len(text) - start
+    pieces = []
+    previous = 0
+
+    def span(begin, end):
+        if end <= len_head:
+            return head[begin:end]
+        if begin >= len_head:
+            return text[start + begin - len_head:start + end - len_head]
+        return head[begin:] + text[start:start + end - len_head]
+
+    noises = get_random_characs_group_b(x, config)
+
+    for inserted, position in enumerate(rng.sorted_sample(length + x, x)):
+        index = position - inserted
+        pieces.append(span(previous, index))
+        pieces.append(noises[inserted])
+        previous = index
+
+    pieces.append(span(previous, length))
+
+    return ''.join(pieces)
+
+def obscur(string, config=None):
     """
     Applies multiple transformations to obscure the text.
 
     Args:
         string (str): The input text.
+        config (dict): The settings to use.
 
     Returns:
         str: The obscured text.
     """
-    string = combine_charac_a(string, get_random_charac_group_b())
-    string = combine_charac_b(string)
-    string = combine_charac_c(string, randint(mini_add_group_b_charac, maxi_add_group_b_charac))
+    config = config or settings.load_settings()
+    noise_a, noise_b = get_random_characs_group_b(2, config)
+
+    # Only the first len(noise_a) characters are interleaved, twice
+    start = min(len(noise_a), len(string))
+    head = combine_charac_a(combine_charac_a(string[:start], noise_a), noise_b)
+
+    x = rng.randint(config["mini_add_group_b_charac"], config["maxi_add_group_b_charac"])
 
-    return string
+    return scatter_charac_b(head, string, start, x, config)
 
-def remove_group_charac_b(code):
+def remove_group_charac_b(code, config=None):
     """
     Removes all characters from group_b in the given text.
 
     Args:
         code (str): The input text.
+        config (dict): The settings to use.
 
     Returns:
         str: The cleaned text.
     """
-    return ''.join(char for char in code if char not in group_b)
+    return code.translate((config or settings.load_settings())["group_b_table"])
 
 
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Character Database
+Description: Compiles a character database (BDC) such as `configs/all.txt` into a validated artifact.
+
+The compiled artifact is a JSON file written next to the source (`all.txt` ->
+`all.compiled.json`). It holds the deduplicated characters in their original
+order, without the `charac_sub` characters and line breaks, already split into
+group A and group B, and the size, modification time and content hash of the
+source. Loading reuses the artifact until the source content or `charac_sub`
+changes; the source is only read and hashed when its size or modification time
+differ from the recorded ones, and a source that was only touched gets its new
+modification time recorded.
+
+The artifact is written through a temporary file; when it cannot be written
+(for instance on a read-only install), the compiled tables are used from memory.
+
+Functions:
+- compiled_path(src): Returns the artifact path of a character database.
+- compile_charac_db(src, charac_sub, dst): Compiles a character database and writes its artifact.
+- load_charac_db(src, charac_sub): Loads the compiled database, recompiling it if the source changed.
+
+
+"""
+
+import json
+import os
+from hashlib import sha256
+
+COMPILED_VERSION = 3
+COMPILED_SUFFIX = ".compiled.json"
+
+def compiled_path(src):
+    """
+    Returns the artifact path of a character database.
+
+    Args:
+        src (str): The character database file.
+
+    Returns:
+        str: The compiled artifact path.
+    """
+    return os.path.splitext(src)[0] + COMPILED_SUFFIX
+
+def _write(dst, compiled):
+    """
+    Writes an artifact atomically, leaving it unwritten if the directory is read-only.
+    """
+    temporary = f"{dst}.{os.getpid()}.tmp"
+
+    try:
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(compiled, file, ensure_ascii=False)
+        os.replace(temporary, dst)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+def compile_charac_db(src, charac_sub, dst=None):
+    """
+    Compiles a character database and writes its artifact when possible.
+
+    Args:
+        src (str): The character database file.
+        charac_sub (str): The substituted characters, which are removed from the database.
+        dst (str): The artifact path (default: `compiled_path(src)`).
+
+    Returns:
+        dict: The compiled database.
+    """
+    with open(src, "rb") as file:
+        data = file.read()
+        mtime_ns = os.fstat(file.fileno()).st_mtime_ns
+
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise Exception(f"ERROR: Failed to read substitution file: {e}")
+
+    excluded = set(charac_sub) | {"\n", "\r"}
+    characs = "".join(charac for charac in dict.fromkeys(text) if charac not in excluded)
+
+    if len(characs) < 2:
+        raise Exception(f"ERROR: Substitution file '{src}' needs at least two usable characters.")
+
+    middle_index = len(characs) // 2
+    group_a, group_b = characs[:middle_index], characs[middle_index:]
+    compiled = {
+        "version": COMPILED_VERSION,
+        "source": src,
+        "size": len(data),
+        "mtime_ns": mtime_ns,
+        "hash": sha256(data).hexdigest(),
+        "charac_sub": charac_sub,
+        "group_a": group_a,
+        "group_b": group_b,
+    }
+
+    _write(dst or compiled_path(src), compiled)
+
+    return compiled
+
+def load_charac_db(src, charac_sub):
+    """
+    Loads the compiled database, recompiling it if the source changed.
+
+    The artifact is reused when the source has the same size and modification
+    time, or else the same content hash.
+
+    Args:
+        src (str): The character database file.
+        charac_sub (str): The substituted characters.
+
+    Returns:
+        dict: The compiled database.
+    """
+    dst = compiled_path(src)
+
+    try:
+        with open(dst, "r", encoding="utf-8") as file:
+            compiled = json.load(file)
+    except (OSError, ValueError):
+        return compile_charac_db(src, charac_sub, dst)
+
+    if compiled.get("version") != COMPILED_VERSION or compiled.get("charac_sub") != charac_sub:
+        return compile_charac_db(src, charac_sub, dst)
+
+    stat = os.stat(src)
+
+    if compiled.get("size") != stat.st_size:
+        return compile_charac_db(src, charac_sub, dst)
+
+    if compiled.get("mtime_ns") != stat.st_mtime_ns:
+        with open(src, "rb") as file:
+            if sha256(file.read()).hexdigest() != compiled.get("hash"):
+                return compile_charac_db(src, charac_sub, dst)
+
+        # Same content: record the new modification time so the next load skips the hash
+        compiled["mtime_ns"] = stat.st_mtime_ns
+        _write(dst, compiled)
+
+    return compiled
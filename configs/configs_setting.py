@@ -7,7 +7,8 @@ Description: This script handles the loading and processing of cipher and substi
 
 Requirements:
 - A JSON configuration file located at `configs/setting.json`.
-- A file specified by `substitute_with` in the configuration file containing substitution characters.
+- A file specified by `substitute_with` in the configuration file containing substitution characters,
+  compiled once by `configs.charac_db` and reused until it changes.
 
 Usage:
 - Used for encryption or text processing systems requiring specific cipher configurations.
@@ -15,85 +16,137 @@ Usage:
 K3rn3l
 """
 
-import json
 import os
+from functools import lru_cache
 from string import ascii_lowercase, ascii_uppercase, ascii_letters, digits, punctuation
 
 # Define accent characters
 ACCENT_CHARACTERS = "ÄÀÂÉÈÊËÎÏÔÙÛÜÇàâéèêëîïôùûüç"
 
-# Load configuration data
-try:
-    with open("configs/setting.json", "r", encoding="utf-8") as config_file:
-        config_data = json.load(config_file)
-except FileNotFoundError:
-    raise Exception("ERROR: Configuration file 'configs/setting.json' not found.")
-except json.JSONDecodeError:
-    raise Exception("ERROR: Failed to parse 'configs/setting.json'. Ensure it is a valid JSON file.")
-
-# Validate and process cipher settings
-cipher_type = config_data.get("cipher")
-if cipher_type == "ascii_lowercase":
-    charac_sub = ascii_lowercase
-elif cipher_type == "ascii_uppercase":
-    charac_sub = ascii_uppercase
-elif cipher_type == "ascii_letters":
-    charac_sub = ascii_letters
-else:
-    raise Exception("ERROR: Unknown cipher option. Expected 'ascii_lowercase', 'ascii_uppercase', or 'ascii_letters'.")
-
-# Add punctuation to the character set if specified
-if config_data.get("cipher_punctuation") == "True":
-    charac_sub += punctuation
-elif config_data.get("cipher_punctuation") != "False":
-    raise Exception("ERROR: Invalid value for 'cipher_punctuation'. Use 'True' or 'False'.")
-
-# Add digits to the character set if specified
-if config_data.get("cipher_digits") == "True":
-    charac_sub += digits
-elif config_data.get("cipher_digits") != "False":
-    raise Exception("ERROR: Invalid value for 'cipher_digits'. Use 'True' or 'False'.")
-
-# Add accent characters to the character set if specified
-if config_data.get("cipher_accent") == "True":
-    charac_sub += ACCENT_CHARACTERS
-elif config_data.get("cipher_accent") != "False":
-    raise Exception("ERROR: Invalid value for 'cipher_accent'. Use 'True' or 'False'.")
-
-# Add special characters and space
-special_charac = config_data.get("special_charac", "") + '\"\\'
-charac_sub += " "
-len_charac_sub = len(charac_sub)
-
-# Validate substitution file
-substitute_file = config_data.get("substitue_with")
-if not os.path.exists(substitute_file):
-    raise Exception(f"ERROR: Substitution file '{substitute_file}' not found.")
-
-# Read substitution characters
-try:
-    with open(substitute_file, "r", encoding="utf-8") as file:
-        init_charac_group = "".join(file.readlines()).strip()
-except Exception as e:
-    raise Exception(f"ERROR: Failed to read substitution file: {e}")
-
-# Split substitution characters into groups
-middle_index = len(init_charac_group) // 2
-group_a = init_charac_group[:middle_index]
-group_b = init_charac_group[middle_index:]
-
-# Load additional settings
-charac_len = config_data.get("charac_len")
-len_special_charac = config_data.get("len_special_charac")
-key_number = config_data.get("key_number")
-len_charac_group_b = config_data.get("len_charac_group_b")
-mini_add_group_b_charac = config_data.get("mini_add_group_b_charac")
-maxi_add_group_b_charac = config_data.get("max_add_group_b_charac")
-
-# Debugging information (can be removed in production)
-"""print(f"Character Substitution Set: {charac_sub}")
-print(f"Group A: {group_a}")
-print(f"Group B: {group_b}")"""
-
-
-
+# Default configuration file
+SETTINGS_PATH = "configs/setting.json"
+# Number of configurations kept by `load_settings`
+SETTINGS_CACHE_SIZE = 8
+# Settings served as module attributes
+SETTING_NAMES = frozenset((
+    "config_data", "cipher_type", "charac_sub", "len_charac_sub", "special_charac", "substitute_file",
+    "charac_db_hash", "group_a", "group_b", "group_b_table", "charac_len", "len_special_charac",
+    "key_number", "len_charac_group_b", "mini_add_group_b_charac", "maxi_add_group_b_charac",
+))
+
+def load_settings(path=SETTINGS_PATH):
+    """
+    Loads and validates a configuration file and its substitution file, cached per file.
+
+    The `SETTINGS_CACHE_SIZE` most recently used configurations are kept, keyed
+    on the absolute path, so each file is read once per process. Module attributes
+    such as `group_a` or `charac_sub` are served from the default configuration the
+    first time they are accessed, which keeps importing this module free.
+
+    Args:
+        path (str): The JSON configuration file.
+
+    Returns:
+        dict: The processed settings.
+    """
+    return _load_cached(os.path.abspath(path))
+
+@lru_cache(maxsize=SETTINGS_CACHE_SIZE)
+def _load_cached(path):
+    return read_settings(path)
+
+def read_settings(path=SETTINGS_PATH):
+    """
+    Loads and validates a configuration file and its substitution file, without caching.
+
+    Args:
+        path (str): The JSON configuration file.
+
+    Returns:
+        dict: The processed settings.
+    """
+    import json
+    from configs.charac_db import load_charac_db
+
+    # Load configuration data
+    try:
+        with open(path, "r", encoding="utf-8") as config_file:
+            config_data = json.load(config_file)
+    except FileNotFoundError:
+        raise Exception(f"ERROR: Configuration file '{path}' not found.")
+    except json.JSONDecodeError:
+        raise Exception(f"ERROR: Failed to parse '{path}'. Ensure it is a valid JSON file.")
+
+    # Validate and process cipher settings
+    cipher_type = config_data.get("cipher")
+    if cipher_type == "ascii_lowercase":
+        charac_sub = ascii_lowercase
+    elif cipher_type == "ascii_uppercase":
+        charac_sub = ascii_uppercase
+    elif cipher_type == "ascii_letters":
+        charac_sub = ascii_letters
+    else:
+        raise Exception("ERROR: Unknown cipher option. Expected 'ascii_lowercase', 'ascii_uppercase', or 'ascii_letters'.")
+
+    # Add punctuation to the character set if specified
+    if config_data.get("cipher_punctuation") == "True":
+        charac_sub += punctuation
+    elif config_data.get("cipher_punctuation") != "False":
+        raise Exception("ERROR: Invalid value for 'cipher_punctuation'. Use 'True' or 'False'.")
+
+    # Add digits to the character set if specified
+    if config_data.get("cipher_digits") == "True":
+        charac_sub += digits
+    elif config_data.get("cipher_digits") != "False":
+        raise Exception("ERROR: Invalid value for 'cipher_digits'. Use 'True' or 'False'.")
+
+    # Add accent characters to the character set if specified
+    if config_data.get("cipher_accent") == "True":
+        charac_sub += ACCENT_CHARACTERS
+    elif config_data.get("cipher_accent") != "False":
+        raise Exception("ERROR: Invalid value for 'cipher_accent'. Use 'True' or 'False'.")
+
+    # Add special characters and space
+    special_charac = config_data.get("special_charac", "") + '\"\\'
+    charac_sub += " "
+
+    # Validate substitution file
+    substitute_file = config_data.get("substitue_with")
+    if not os.path.exists(substitute_file):
+        raise Exception(f"ERROR: Substitution file '{substitute_file}' not found.")
+
+    # Load the compiled substitution characters, split into groups
+    charac_db = load_charac_db(substitute_file, charac_sub)
+    group_a, group_b = charac_db["group_a"], charac_db["group_b"]
+
+    return {
+        "config_data": config_data,
+        "cipher_type": cipher_type,
+        "charac_sub": charac_sub,
+        "len_charac_sub": len(charac_sub),
+        "special_charac": special_charac,
+        "substitute_file": substitute_file,
+        "charac_db_hash": charac_db["hash"],
+        "group_a": group_a,
+        "group_b": group_b,
+        # Deletion table for stripping group B characters
+        "group_b_table": str.maketrans("", "", group_b),
+        # Load additional settings
+        "charac_len": config_data.get("charac_len"),
+        "len_special_charac": config_data.get("len_special_charac"),
+        "key_number": config_data.get("key_number"),
+        "len_charac_group_b": config_data.get("len_charac_group_b"),
+        "mini_add_group_b_charac": config_data.get("mini_add_group_b_charac"),
+        "maxi_add_group_b_charac": config_data.get("max_add_group_b_charac"),
+    }
+
+def __getattr__(name):
+    """
+    Serves settings of the default configuration as module attributes, loading it on first access.
+
+    Other names, such as the dunder names probed by `inspect` or `mock`, never load it.
+    """
+    if name in SETTING_NAMES:
+        return load_settings()[name]
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
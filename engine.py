@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Engine
+Description: Self-contained MSE engines, one per configuration profile, held in a bounded registry.
+
+An `MSEEngine` wraps a configuration file, its key library and their compiled
+tables, so several profiles (each with its own `setting.json`, character database
+and key library) can be served by one process. `get_engine` keeps the most recently
+used engines in an LRU registry, so loading a profile is a one-off cost.
+
+Classes:
+- MSEEngine(settings_path, keylib_path): Encrypts and decrypts with one configuration and key library.
+
+Functions:
+- get_engine(settings_path, keylib_path): Returns the engine of a profile from the registry, loading it if needed.
+- clear_engines(): Empties the registry.
+
+
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+import rng
+from configs.configs_setting import read_settings, SETTINGS_PATH
+from keylib import KeyLibrary, KEYLIB_PATH
+from bloc_a import complexify, decomplexify
+from bloc_b import key_table, build_decoder, decode, KEY_CACHE_SIZE
+from bloc_c import obscur, remove_group_charac_b
+from instrument import run_stage
+
+# Number of engines kept in the registry
+ENGINE_REGISTRY_SIZE = 16
+
+class MSEEngine:
+    """
+    Encrypts and decrypts with one configuration and key library.
+
+    The settings are loaded when the engine is created, outside the settings
+    cache so they are freed with the engine; the key library is opened (or
+    generated) and the decoder built on first use.
+    """
+
+    def __init__(self, settings_path=SETTINGS_PATH, keylib_path=KEYLIB_PATH):
+        self.settings_path = settings_path
+        self.keylib_path = keylib_path
+        self.config = read_settings(settings_path)
+        self._key_list = None
+        self._decoder = None
+        self._lock = threading.Lock()
+        self.compile_key = lru_cache(maxsize=KEY_CACHE_SIZE)(self._key_table)
+
+    def _key_table(self, key):
+        return key_table(key, self.config["charac_sub"])
+
+    @property
+    def key_list(self):
+        """
+        The key library, generated on first use if the file does not exist.
+        """
+        if self._key_list is None:
+            with self._lock:
+                if self._key_list is None:
+                    if not os.path.exists(self.keylib_path):
+                        from key_generator import key_lib_generator
+                        key_number = self.config["key_number"]
+                        key_lib_generator(key_number[0], key_number[1], self.keylib_path, config=self.config)
+
+                    self._key_list = KeyLibrary(self.keylib_path)
+
+        return self._key_list
+
+    @property
+    def decoder(self):
+        """
+        The decoder of the key library, built on first use.
+        """
+        if self._decoder is None:
+            with self._lock:
+                if self._decoder is None:
+                    self._decoder = build_decoder(self.key_list, self.config["charac_sub"])
+
+        return self._decoder
+
+    def substitute(self, plain_text):
+        """
+        Substitutes every character with the tokens of a randomly chosen key (Block B).
+        """
+        return plain_text.translate(self.compile_key(rng.choice(self.key_list)))
+
+    def restore(self, coded_msg):
+        """
+        Maps the tokens of any key back to their characters (Block B).
+        """
+        return decode(coded_msg, self.decoder)
+
+    def cipher(self, msg):
+        """
+        Encrypts a message.
+
+        Args:
+            msg (str): The input message to be encrypted.
+
+        Returns:
+            str: The encrypted message.
+        """
+        if not isinstance(msg, str):
+            raise ValueError("Input must be a string.")
+
+        a = run_stage("complexify", complexify, msg)
+        b = run_stage("cipher", self.substitute, a)
+        return run_stage("obscur", lambda text: obscur(text, self.config), b)
+
+    def cipher_fused(self, msg):
+        """
+        Encrypts a message in a single pass (see `fused.fused_cipher`).
+
+        Args:
+            msg (str): The input message to be encrypted.
+
+        Returns:
+            str: The encrypted message.
+        """
+        from fused import fused_cipher
+        return fused_cipher(msg, self.config, self.compile_key(rng.choice(self.key_list)))
+
+    def decipher(self, msg):
+        """
+        Decrypts a message to its original form.
+
+        Args:
+            msg (str): The encrypted message to be decrypted.
+
+        Returns:
+            str: The original message.
+        """
+        if not isinstance(msg, str):
+            raise ValueError("Input must be a string.")
+
+        c = run_stage("remove_group_charac_b", lambda text: remove_group_charac_b(text, self.config), msg)
+        b = run_stage("decipher", self.restore, c)
+        return run_stage("decomplexify", decomplexify, b)
+
+    def close(self):
+        """
+        Releases the key library mapping.
+        """
+        if self._key_list is not None:
+            self._key_list.close()
+
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+def get_engine(settings_path=SETTINGS_PATH, keylib_path=KEYLIB_PATH):
+    """
+    Returns the engine of a profile from the registry, loading it if needed.
+
+    The registry keeps the `ENGINE_REGISTRY_SIZE` most recently used engines. An
+    evicted engine is not closed, since a caller may still hold it; its key library
+    is unmapped once it is garbage collected.
+
+    Args:
+        settings_path (str): The JSON configuration file of the profile.
+        keylib_path (str): The binary key library of the profile.
+
+    Returns:
+        MSEEngine: The engine of the profile.
+    """
+    profile = (os.path.abspath(settings_path), os.path.abspath(keylib_path))
+
+    with _engines_lock:
+        engine = _engines.get(profile)
+
+        if engine is not None:
+            _engines.move_to_end(profile)
+            return engine
+
+    engine = MSEEngine(settings_path, keylib_path)
+
+    with _engines_lock:
+        engine = _engines.setdefault(profile, engine)
+        _engines.move_to_end(profile)
+
+        while len(_engines) > ENGINE_REGISTRY_SIZE:
+            _engines.popitem(last=False)
+
+    return engine
+
+def clear_engines():
+    """
+    Empties the registry.
+    """
+    with _engines_lock:
+        _engines.clear()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Fused
+Description: Single-pass encryption producing the same format as `mse_cipher`.
+
+The staged pipeline builds a full-size string after every step: the reversed text,
+the list of its words, the rearranged words, the substituted text and the obscured
+text, and calls `reverse_word` once per word. `fused_cipher` walks the message once,
+from the end, in chunks of about `CHUNK_SIZE` characters cut on spaces, and turns
+each chunk straight into its substituted form (reverse, half swap, substitution).
+Every distinct word is rearranged and substituted once and then looked up, so the
+per-word work of a chunk runs in C; chunks of mostly distinct words are substituted
+in one translate instead. The pieces are the only full-size buffer besides the
+output: the group B noise is spliced into them and everything is assembled in a
+single join. The result is decrypted by the regular `mse_decipher`.
+
+Functions:
+- fused_cipher(msg, config, table): Encrypts a message in one pass over its words.
+
+
+"""
+
+import rng
+from configs import configs_setting as settings
+from text_obscur import reverse_word
+from bloc_b import compile_key, get_key_list
+from bloc_c import combine_charac_a, get_random_characs_group_b
+
+# Characters of the message rearranged and substituted together
+CHUNK_SIZE = 1 << 14
+# Number of substituted words remembered before the memo is cleared
+MEMO_SIZE = 1 << 16
+
+def _take_head(pieces, count):
+    """
+    Removes the first `count` characters from a list of pieces and returns them.
+    """
+    head = []
+    taken = 0
+    index = 0
+
+    while taken < count:
+        piece = pieces[index]
+        if taken + len(piece) <= count:
+            head.append(piece)
+            taken += len(piece)
+            index += 1
+        else:
+            head.append(piece[:count - taken])
+            pieces[index] = piece[count - taken:]
+            taken = count
+
+    del pieces[:index]
+    return ''.join(head)
+
+def _scatter(pieces, length, x, config):
+    """
+    Splices x group B strings into a list of pieces at uniformly random character positions.
+
+    The list is emptied as its pieces are used, so a piece and its slices are never
+    held together for the whole text.
+    """
+    output = []
+    append = output.append
+    positions = iter(rng.sorted_sample(length + x, x))
+    noises = get_random_characs_group_b(x, config)
+    inserted = 0
+    target = next(positions, None)
+    offset = 0
+
+    pieces.reverse()
+
+    while pieces:
+        piece = pieces.pop()
+        end = offset + len(piece)
+        cut = 0
+
+        # A noise string follows the first (position - strings inserted so far) characters
+        while target is not None and target - inserted <= end:
+            index = target - inserted - offset
+            append(piece[cut:index])
+            append(noises[inserted])
+            cut = index
+            inserted += 1
+            target = next(positions, None)
+
+        append(piece[cut:])
+        offset = end
+
+    return output
+
+def fused_cipher(msg, config=None, table=None):
+    """
+    Encrypts a message in one pass over its words.
+
+    Args:
+        msg (str): The input message to be encrypted.
+        config (dict): Settings from `load_settings` (default: the default configuration).
+        table (dict): The `str.translate` table of the key to use (default: a random key
+            of the default key library).
+
+    Returns:
+        str: The encrypted message, in the format produced by `mse_cipher`.
+    """
+    if not isinstance(msg, str):
+        raise ValueError("Input must be a string.")
+
+    config = config or settings.load_settings()
+    table = table or compile_key(rng.choice(get_key_list()))
+    space = " ".translate(table)
+
+    forms = {}
+    pieces = []
+    append = pieces.append
+    end = len(msg)
+
+    # Reverse, half swap and substitute the words from the last to the first, a chunk at a time
+    while True:
+        start = msg.rfind(" ", 0, max(end - CHUNK_SIZE, 0)) + 1
+        words = msg[start:end][::-1].split(" ")
+
+        new_words = set(words).difference(forms)
+
+        # Mostly distinct words are cheaper to substitute in one translate, as staged
+        if 2 * len(new_words) > len(words):
+            append(" ".join([reverse_word(word) for word in words]).translate(table))
+        else:
+            if len(forms) > MEMO_SIZE:
+                forms.clear()
+            for word in new_words:
+                forms[word] = reverse_word(word).translate(table)
+
+            append(space.join(map(forms.__getitem__, words)))
+
+        if start == 0:
+            break
+        append(space)
+        end = start - 1
+
+    length = sum(map(len, pieces))
+
+    # Interleave the first characters with two noise strings, as `obscur` does
+    noise_a, noise_b = get_random_characs_group_b(2, config)
+    start = min(len(noise_a), length)
+    head = combine_charac_a(combine_charac_a(_take_head(pieces, start), noise_a), noise_b)
+    pieces.insert(0, head)
+    length += len(head) - start
+
+    x = rng.randint(config["mini_add_group_b_charac"], config["maxi_add_group_b_charac"])
+
+    return ''.join(_scatter(pieces, length, x, config))
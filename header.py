@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Header
+Description: Optional versioned ciphertext header recording the key used by Block B.
+
+A ciphertext produced by `mse_cipher(msg, header=True)` starts with a header made
+only of group B characters: a marker, the format version, a fingerprint of the
+configuration and key library, and the index of the key in the library. Since
+group B characters are removed as noise, older decoders and puzzle use still
+read such a ciphertext; `mse_decipher` instead reads the header and decodes with
+that single key rather than with every key of the library.
+
+Numbers are written as fixed-width digits in base `len(group_b)`, using the
+group B characters as digits.
+
+Functions:
+- fingerprint(keys, config): Computes the 32-bit fingerprint of a configuration and key library.
+- get_fingerprint(): Returns the fingerprint of the default configuration and key library.
+- encode_header(index, fingerprint, config): Builds the header of a ciphertext.
+- parse_header(msg, config): Reads the header at the start of a ciphertext, if any.
+
+
+"""
+
+from zlib import crc32
+from configs import configs_setting as settings
+
+HEADER_VERSION = 1
+MARKER_LENGTH = 4
+FIELD_BITS = 32
+
+def fingerprint(keys, config=None):
+    """
+    Computes the 32-bit fingerprint of a configuration and key library.
+
+    Args:
+        keys (KeyLibrary or iterable): The key library.
+        config (dict): Settings from `load_settings` (default: the default configuration).
+
+    Returns:
+        int: A CRC-32 of the substitution alphabet, both character groups and the keys.
+    """
+    config = config or settings.load_settings()
+    value = crc32("\0".join((config["charac_sub"], config["group_a"], config["group_b"])).encode("utf-8"))
+
+    if hasattr(keys, "data"):
+        return crc32(keys.data, value)
+
+    for key in keys:
+        value = crc32(key.encode("utf-8") + b"\n", value)
+
+    return value
+
+def get_fingerprint():
+    """
+    Returns the fingerprint of the default configuration and the current key library snapshot.
+
+    Returns:
+        int: The fingerprint.
+    """
+    from bloc_b import get_snapshot
+    return get_snapshot().fingerprint
+
+def _width(base):
+    width = 1
+    while base ** width < 1 << FIELD_BITS:
+        width += 1
+    return width
+
+def _marker(group_b):
+    return (group_b * MARKER_LENGTH)[:MARKER_LENGTH]
+
+def encode_header(index, fingerprint, config=None):
+    """
+    Builds the header of a ciphertext.
+
+    Args:
+        index (int): The index of the key in the library.
+        fingerprint (int): The fingerprint of the configuration and key library.
+        config (dict): The settings to use.
+
+    Returns:
+        str: The header, made of group B characters.
+    """
+    config = config or settings.load_settings()
+    group_b = config["group_b"]
+    base = len(group_b)
+
+    if base < 2:
+        raise Exception("ERROR: Group B needs at least two characters to encode a header.")
+
+    digits = []
+    width = _width(base)
+
+    for value in (index, fingerprint):
+        field = []
+        for _ in range(width):
+            value, digit = divmod(value, base)
+            field.append(group_b[digit])
+        digits.extend(reversed(field))
+
+    return _marker(group_b) + group_b[HEADER_VERSION] + ''.join(digits)
+
+def parse_header(msg, config=None):
+    """
+    Reads the header at the start of a ciphertext, if any.
+
+    Args:
+        msg (str): The ciphertext.
+        config (dict): The settings to use.
+
+    Returns:
+        tuple: The key index, the fingerprint and the header length, or None when
+            the ciphertext has no header of a known version.
+    """
+    config = config or settings.load_settings()
+    group_b = config["group_b"]
+    base = len(group_b)
+
+    if base < 2 or not msg.startswith(_marker(group_b)):
+        return None
+
+    width = _width(base)
+    length = MARKER_LENGTH + 1 + 2 * width
+    header = msg[:length]
+
+    if len(header) < length or header[MARKER_LENGTH] != group_b[HEADER_VERSION]:
+        return None
+
+    fields = []
+    position = MARKER_LENGTH + 1
+
+    for _ in range(2):
+        value = 0
+        for charac in header[position:position + width]:
+            digit = group_b.find(charac)
+            if digit < 0:
+                return None
+            value = value * base + digit
+        fields.append(value)
+        position += width
+
+    return fields[0], fields[1], length
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Instrument
+Description: Opt-in timing and size instrumentation of the MSE pipeline stages.
+
+Each stage of `mse_cipher` and `mse_decipher` runs through `run_stage`. While no
+sink is registered it only calls the stage. Once a sink is registered, every
+stage call produces an event with its wall time, input and output length and the
+change in allocated memory blocks, which is passed to every sink. While
+`tracemalloc` is tracing, the event also holds the peak allocation of the stage.
+
+Classes:
+- MemorySink(): Aggregates events into counters and duration histograms.
+- LoggingSink(logger, level): Logs every event.
+- PeakMemorySink(): Keeps the largest peak allocation of every stage.
+
+Functions:
+- add_sink(sink): Registers a sink (any object with a `record(event)` method).
+- remove_sink(sink): Unregisters a sink.
+- instrumented(sink): Context manager registering a sink for the duration of a block.
+- memory_profile(): Context manager tracing allocations and collecting the peak of every stage.
+- run_stage(name, function, argument): Runs a pipeline stage, reporting it to the sinks if any.
+
+
+"""
+
+import sys
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+# Upper bounds of the duration histogram buckets, in seconds
+HISTOGRAM_BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0, float("inf"))
+
+_sinks = []
+
+class MemorySink:
+    """
+    Aggregates events into counters and duration histograms.
+
+    Counters are named `<stage>.calls`, `<stage>.input_length`, `<stage>.output_length`
+    and `<stage>.allocated_blocks`; histograms are named `<stage>.seconds` and count
+    calls per `HISTOGRAM_BUCKETS` bucket.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def record(self, event):
+        stage = event["stage"]
+
+        for name in ("input_length", "output_length", "allocated_blocks"):
+            self.counters[f"{stage}.{name}"] = self.counters.get(f"{stage}.{name}", 0) + event[name]
+        self.counters[f"{stage}.calls"] = self.counters.get(f"{stage}.calls", 0) + 1
+
+        histogram = self.histograms.setdefault(f"{stage}.seconds", [0] * len(HISTOGRAM_BUCKETS))
+        histogram[bisect_left(HISTOGRAM_BUCKETS, event["seconds"])] += 1
+
+class LoggingSink:
+    """
+    Logs every event with a `logging.Logger`.
+    """
+
+    def __init__(self, logger=None, level=10):
+        if logger is None:
+            import logging
+            logger = logging.getLogger("mse")
+
+        self.logger = logger
+        self.level = level
+
+    def record(self, event):
+        self.logger.log(self.level, "%(stage)s %(seconds).6fs %(input_length)d -> %(output_length)d chars, "
+                                    "%(allocated_blocks)+d blocks", event)
+
+class PeakMemorySink:
+    """
+    Keeps the largest peak allocation of every stage, in bytes.
+
+    Peaks are above the memory allocated when the stage started, so they include
+    the stage output and its temporary copies but not its input.
+    """
+
+    def __init__(self):
+        self.peaks = {}
+
+    def record(self, event):
+        if event["peak_bytes"] is not None:
+            stage = event["stage"]
+            self.peaks[stage] = max(self.peaks.get(stage, 0), event["peak_bytes"])
+
+def add_sink(sink):
+    """
+    Registers a sink.
+
+    Args:
+        sink (object): An object with a `record(event)` method.
+    """
+    _sinks.append(sink)
+
+def remove_sink(sink):
+    """
+    Unregisters a sink.
+
+    Args:
+        sink (object): A sink registered with `add_sink`.
+    """
+    _sinks.remove(sink)
+
+@contextmanager
+def instrumented(sink):
+    """
+    Registers a sink for the duration of a `with` block.
+
+    Args:
+        sink (object): An object with a `record(event)` method.
+
+    Yields:
+        object: The sink.
+    """
+    add_sink(sink)
+    try:
+        yield sink
+    finally:
+        remove_sink(sink)
+
+@contextmanager
+def memory_profile():
+    """
+    Traces allocations with `tracemalloc` for the duration of a `with` block and
+    collects the peak allocation of every stage run in it.
+
+    Tracing slows every allocation down, so timings taken meanwhile are not representative.
+
+    Yields:
+        PeakMemorySink: The sink, whose `peaks` map stage names to bytes.
+    """
+    import tracemalloc
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+
+    try:
+        with instrumented(PeakMemorySink()) as sink:
+            yield sink
+    finally:
+        if started:
+            tracemalloc.stop()
+
+def run_stage(name, function, argument):
+    """
+    Runs a pipeline stage, reporting it to the registered sinks if there are any.
+
+    Args:
+        name (str): The stage name.
+        function (callable): The stage, taking and returning a string.
+        argument (str): The stage input.
+
+    Returns:
+        str: The stage output.
+    """
+    if not _sinks:
+        return function(argument)
+
+    import tracemalloc
+
+    # The peak of the whole process is reset, so it only covers this stage
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    blocks = sys.getallocatedblocks()
+    start = perf_counter()
+    result = function(argument)
+    event = {
+        "stage": name,
+        "seconds": perf_counter() - start,
+        "input_length": len(argument),
+        "output_length": len(result),
+        "allocated_blocks": sys.getallocatedblocks() - blocks,
+        "peak_bytes": tracemalloc.get_traced_memory()[1] - allocated if tracing else None,
+    }
+
+    for sink in _sinks:
+        sink.record(event)
+
+    return result
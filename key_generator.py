@@ -8,16 +8,20 @@ Description: Generates encryption keys and key libraries for the substitution en
 Functions:
 - get_random_charac(x): Creates a random string of a specified length from group_a characters.
 - key_gen(len_charac_sub): Generates a substitution key for all characters in the defined set.
-- key_lib_generator(min_nbr_key, max_nbr_key): Generates a library of keys and saves it to `keylib.txt`.
+- random_indices(count, bound): Draws uniform integers below `bound` from the `rng` provider.
+- key_gen_bulk(count, config): Generates several keys from bulk random draws.
+- key_lib_generator(min_nbr_key, max_nbr_key, path, processes, batch_size, config): Generates a library of keys and saves it to `keylib.bin`.
 
 Dependencies:
 - Requires configurations from `configs_setting`.
+- Draws random values from the `rng` provider.
 
 
 """
 
-from random import randint, choice
-from configs.configs_setting import group_a, charac_sub, charac_len, len_special_charac, special_charac, len_charac_sub
+import rng
+from keylib import write_keylib, KEYLIB_PATH
+from configs import configs_setting as settings
 
 def get_random_charac(x):
     """
@@ -29,7 +33,8 @@ def get_random_charac(x):
     Returns:
         str: A random string of characters from group_a.
     """
-    return ''.join(choice(group_a) for _ in range(x))
+    group_a = settings.group_a
+    return rng.random_string(group_a, x)
 
 def key_gen(len_charac_sub):
     """
@@ -42,10 +47,12 @@ def key_gen(len_charac_sub):
         str: A substitution key formatted as space-separated strings.
     """
     key = ''
+    charac_sub, special_charac = settings.charac_sub, settings.special_charac
+    charac_len, len_special_charac = settings.charac_len, settings.len_special_charac
 
     for charac in range(len_charac_sub):
-        charac_len_ = randint(charac_len[0], charac_len[1])
-        special_charac_ = randint(len_special_charac[0], len_special_charac[1])
+        charac_len_ = rng.randint(charac_len[0], charac_len[1])
+        special_charac_ = rng.randint(len_special_charac[0], len_special_charac[1])
 
         if charac_sub[charac] in special_charac:
             key += f'{get_random_charac(special_charac_)} '
@@ -53,17 +60,102 @@ def key_gen(len_charac_sub):
 
     return key.strip()
 
-def key_lib_generator(min_nbr_key, max_nbr_key):
+def random_indices(count, bound):
+    """
+    Draws uniform integers below `bound` from the buffered `rng` provider.
+
+    Args:
+        count (int): The number of integers to draw.
+        bound (int): The exclusive upper bound.
+
+    Returns:
+        list: `count` integers in `range(bound)`.
+    """
+    return rng.indices(count, bound)
+
+def key_gen_bulk(count, config=None):
+    """
+    Generates several substitution keys from bulk random draws.
+
+    Token lengths and group_a characters for all `count` keys are drawn in a few
+    large buffered draws instead of one `randint`/`choice` call per character.
+    Keys follow the same layout as `key_gen`.
+
+    Args:
+        count (int): The number of keys to generate.
+        config (dict): Settings from `load_settings` (default: the default configuration).
+
+    Returns:
+        list: The keys, formatted as space-separated strings.
+    """
+    config = config or settings.load_settings()
+    group_a, charac_sub, special_charac = config["group_a"], config["charac_sub"], config["special_charac"]
+    mini, maxi = config["charac_len"]
+    mini_special, maxi_special = config["len_special_charac"]
+
+    # Token layout of one key: an extra special token before each special character
+    specials = [charac in special_charac for charac in charac_sub]
+    tokens_per_key = len(charac_sub) + sum(specials)
+
+    lengths = random_indices(count * len(charac_sub), maxi - mini + 1)
+    special_lengths = random_indices(count * sum(specials), maxi_special - mini_special + 1)
+    token_lengths = []
+    regular, special = iter(lengths), iter(special_lengths)
+
+    for _ in range(count):
+        for is_special in specials:
+            if is_special:
+                token_lengths.append(mini_special + next(special))
+            token_lengths.append(mini + next(regular))
+
+    characs = ''.join(map(group_a.__getitem__, random_indices(sum(token_lengths), len(group_a))))
+    tokens = []
+    position = 0
+
+    for length in token_lengths:
+        tokens.append(characs[position:position + length])
+        position += length
+
+    return [' '.join(tokens[n:n + tokens_per_key]) for n in range(0, len(tokens), tokens_per_key)]
+
+def key_lib_generator(min_nbr_key, max_nbr_key, path=KEYLIB_PATH, processes=1, batch_size=100, config=None):
     """
     Generates a key library containing multiple substitution keys.
 
+    Keys are generated in batches with `key_gen_bulk` and streamed to a temporary
+    file as each batch is ready, which then atomically replaces `path`. With
+    `processes` above 1, batches are generated by a pool of worker processes.
+
     Args:
         min_nbr_key (int): The minimum number of keys to generate.
         max_nbr_key (int): The maximum number of keys to generate.
+        path (str): The binary key library to write.
+        processes (int): The number of processes generating keys (None for the CPU count).
+        batch_size (int): The number of keys generated per batch.
+        config (dict): Settings from `load_settings` (default: the default configuration).
 
     Writes:
-        Creates a `keylib.txt` file with all generated keys.
+        Creates a binary key library (`keylib.bin` by default) with all generated keys.
     """
-    with open('keylib.txt', 'w', encoding='utf-8') as file:
-        for _ in range(min_nbr_key, max_nbr_key):
-            file.write(f'{key_gen(len_charac_sub)}\n')
+    total = max(max_nbr_key - min_nbr_key, 0)
+    batches = [min(batch_size, total - n) for n in range(0, total, batch_size)]
+
+    config = config or settings.load_settings()
+
+    def keys():
+        if processes == 1 or len(batches) < 2:
+            for batch in batches:
+                yield from key_gen_bulk(batch, config)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Workers only need the settings used by key_gen_bulk
+            needed = ("group_a", "charac_sub", "special_charac", "charac_len", "len_special_charac")
+            worker_config = {name: config[name] for name in needed}
+
+            with ProcessPoolExecutor(processes) as executor:
+                for batch_keys in executor.map(key_gen_bulk, batches, [worker_config] * len(batches)):
+                    yield from batch_keys
+
+    # Written to a temporary file and moved into place, so readers never see a half-written library
+    write_keylib(path, keys())
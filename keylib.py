@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Key Library
+Description: Reads and writes the binary key library format.
+
+The file starts with a fixed header, followed by every key line encoded in UTF-8
+back to back, followed by an offset table of `count + 1` little-endian uint64
+values. Key `i` is the blob between offsets `i` and `i + 1`. The table is written
+last so keys can be streamed to disk as they are generated.
+
+Classes:
+- KeyLibWriter(path): Streams key lines into a binary key library.
+- KeyLibrary(path): Memory-maps a binary key library and decodes keys lazily by index.
+
+Functions:
+- convert_text_keylib(src, dst): Converts a text `keylib.txt` into the binary format.
+- write_keylib(path, keys, base): Atomically replaces a library with `base` followed by `keys`.
+
+
+"""
+
+import mmap
+import os
+import struct
+from array import array
+
+KEYLIB_PATH = "keylib.bin"
+TEXT_KEYLIB_PATH = "keylib.txt"
+
+MAGIC = b"MSEK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")  # magic, version, reserved, key count, offset table position
+OFFSET = struct.Struct("<Q")
+
+class KeyLibWriter:
+    """
+    Streams key lines into a binary key library.
+
+    Usage:
+        with KeyLibWriter("keylib.bin") as writer:
+            writer.write(key)
+    """
+
+    def __init__(self, path=KEYLIB_PATH):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+        self.offsets = [HEADER.size]
+
+    def write(self, key):
+        """
+        Appends one key line to the library.
+
+        Args:
+            key (str): A space-separated key line.
+        """
+        data = key.strip().encode("utf-8")
+        self.file.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+
+    def write_library(self, library):
+        """
+        Appends every key of a library, copying its encoded keys without decoding them.
+
+        Args:
+            library (KeyLibrary): The library to copy.
+        """
+        offsets = library.offsets()
+        self.file.write(library.data[offsets[0]:offsets[-1]])
+        shift = self.offsets[-1] - offsets[0]
+        self.offsets.extend(offset + shift for offset in offsets[1:])
+
+    def close(self):
+        """
+        Writes the offset table and the final header, then closes the file.
+        """
+        if self.file.closed:
+            return
+
+        table_position = self.offsets[-1]
+        self.file.write(struct.pack(f"<{len(self.offsets)}Q", *self.offsets))
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, len(self.offsets) - 1, table_position))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class KeyLibrary:
+    """
+    Memory-maps a binary key library and decodes keys lazily by index.
+
+    Opening the library only reads the header, so it costs the same whatever
+    the number of keys. The mapping is read-only, so every process using the
+    same file shares the same page-cache pages.
+    """
+
+    def __init__(self, path=KEYLIB_PATH):
+        self.path = path
+
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(file.fileno())
+
+        # Identifies the file that was mapped, to notice when it is replaced
+        self.signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+        magic, version, _, self.count, self.table_position = HEADER.unpack_from(self.data)
+
+        if magic != MAGIC:
+            raise Exception(f"ERROR: '{path}' is not a binary key library.")
+        if version != VERSION:
+            raise Exception(f"ERROR: Unsupported key library version {version} in '{path}'.")
+        # A writer leaves a zero count and table position until the file is complete
+        if self.count == 0 or self.table_position == 0 \
+                or self.table_position + (self.count + 1) * OFFSET.size > len(self.data):
+            raise Exception(f"ERROR: '{path}' is empty or incomplete.")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("key index out of range")
+
+        start, end = struct.unpack_from("<2Q", self.data, self.table_position + index * OFFSET.size)
+        return self.data[start:end].decode("utf-8")
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def offsets(self):
+        """
+        Returns the offset table: key `i` spans offsets `i` to `i + 1`.
+        """
+        offsets = array("Q")
+        offsets.frombytes(self.data[self.table_position:self.table_position + (self.count + 1) * OFFSET.size])
+        return offsets
+
+    def starts_with(self, other):
+        """
+        Tells whether the first keys of this library are exactly the keys of another one.
+        """
+        if other.count > self.count:
+            return False
+
+        end = other.table_position
+        if self.offsets()[:other.count + 1] != other.offsets():
+            return False
+
+        return self.data[HEADER.size:end] == other.data[HEADER.size:end]
+
+    def close(self):
+        """
+        Unmaps the library file.
+        """
+        self.data.close()
+
+def convert_text_keylib(src=TEXT_KEYLIB_PATH, dst=KEYLIB_PATH):
+    """
+    Converts a text key library (one space-separated key per line) into the binary format.
+
+    Args:
+        src (str): The text key library.
+        dst (str): The binary key library to write.
+
+    Returns:
+        int: The number of keys converted.
+    """
+    with open(src, "r", encoding="utf-8") as key_file:
+        return write_keylib(dst, (key for key in key_file if key.strip()))
+
+def write_keylib(path, keys=(), base=None):
+    """
+    Atomically replaces a binary key library with the keys of `base` followed by `keys`.
+
+    The library is written to a temporary file and moved over `path`, so readers
+    see either the old file or the complete new one. Libraries already mapped
+    keep reading the old file.
+
+    Args:
+        path (str): The binary key library to write.
+        keys (iterable): Key lines to write after those of `base`.
+        base (KeyLibrary): A library whose keys come first, copied without decoding.
+
+    Returns:
+        int: The number of keys in the new library.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+
+    try:
+        with KeyLibWriter(temporary) as writer:
+            if base is not None:
+                writer.write_library(base)
+            for key in keys:
+                writer.write(key)
+
+        with open(temporary, "rb") as file:
+            os.fsync(file.fileno())
+
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+    return len(writer.offsets) - 1
@@ -0,0 +1,540 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Key Store
+Description: Sharded on-disk key library for libraries far larger than `keylib.bin`.
+
+The all-keys decoder of Block B holds every token of every key in memory and
+grows with the library. A key store instead splits the keys into shards of
+`shard_size` keys, each written to a directory as three files:
+
+- `shard-NNNNN.keys`: the keys, in the binary key library format.
+- `shard-NNNNN.index`: every token of the shard as `"<token> <key>"` entries,
+  sorted by token and stored in the key library format, so a token is found by
+  binary search without reading the file.
+- `shard-NNNNN.bloom`: a Bloom filter of the tokens of the shard.
+
+A ciphertext is made with a single key, so its first token identifies the key.
+The candidate tokens at the start of the ciphertext are checked against the
+Bloom filter of every shard; only the shards that may hold one are opened and
+searched. When several keys hold a candidate token, the one decoding the start
+of the ciphertext into the shortest text (the most characters read as tokens)
+wins. The message is then decoded with that key alone.
+
+Every file is memory-mapped and at most `cache_size` shards are kept open, so
+the memory used does not grow with the library. `manifest.json` records the
+shards, the token lengths and the fingerprint of the configuration and keys
+(see `header.fingerprint`), updated as keys are added.
+
+Classes:
+- BloomFilter(path): Memory-maps a Bloom filter of tokens.
+- KeyStore(directory, cache_size, config): Reads a key store and finds the key of a ciphertext.
+
+Functions:
+- build_store(directory, keys, shard_size, config): Writes keys to a key store, creating or extending it.
+- generate_store(directory, count, shard_size, batch_size, config): Generates keys straight into a key store.
+- store_cipher(msg, store, header): Encrypts a message with a random key of a key store.
+- store_decipher(msg, store): Decrypts a message encrypted with a key of a key store.
+
+Usage:
+- python keystore.py build keystore --keylib keylib.bin
+- python keystore.py build keystore --generate 1000000
+
+
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from zlib import crc32
+import rng
+from configs import configs_setting as settings
+from keylib import KeyLibWriter, KeyLibrary
+from bloc_a import complexify, decomplexify
+from bloc_b import parse_key, key_table, build_decoder, decode, KEY_CACHE_SIZE
+from bloc_c import obscur, remove_group_charac_b
+from instrument import run_stage
+from header import encode_header, parse_header, fingerprint
+
+MANIFEST = "manifest.json"
+STORE_VERSION = 1
+SHARD_SIZE = 4096
+# Number of shards kept open by a store
+SHARD_CACHE_SIZE = 8
+# Bloom filter bits per token and hash functions (about 0.05% false positives)
+BLOOM_BITS_PER_TOKEN = 16
+BLOOM_HASHES = 11
+# Characters of the ciphertext decoded to choose between keys sharing a token
+VERIFY_LENGTH = 256
+
+def _hashes(token):
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+def _positions(token, bits):
+    first, step = _hashes(token)
+    return [(first + n * step) % bits for n in range(BLOOM_HASHES)]
+
+class BloomFilter:
+    """
+    Memory-maps a Bloom filter of tokens.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.bits = len(self.data) * 8
+
+    def contains(self, positions):
+        """
+        Tells whether every bit at `positions` (from `_positions`) is set, which is
+        always the case for a token of the filter.
+        """
+        data = self.data
+        for position in positions:
+            if not data[position >> 3] & 1 << (position & 7):
+                return False
+        return True
+
+    @staticmethod
+    def write(path, tokens, bits):
+        """
+        Writes the Bloom filter of a set of tokens.
+
+        Args:
+            path (str): The file to write.
+            tokens (iterable): The tokens.
+            bits (int): The size of the filter in bits, a multiple of 8.
+        """
+        data = bytearray(bits // 8)
+        for token in tokens:
+            for position in _positions(token, bits):
+                data[position >> 3] |= 1 << (position & 7)
+
+        with open(path, "wb") as file:
+            file.write(data)
+
+    def close(self):
+        """
+        Unmaps the filter.
+        """
+        self.data.close()
+
+class _Shard:
+    """
+    The keys and token index of one shard.
+    """
+
+    def __init__(self, prefix):
+        self.keys = KeyLibrary(prefix + ".keys")
+        self.index = KeyLibrary(prefix + ".index")
+
+    def lookup(self, token):
+        """
+        Returns the indexes in the shard of the keys holding a token.
+        """
+        index = self.index
+        low, high = 0, len(index)
+
+        # Leftmost entry whose token is not below `token`
+        while low < high:
+            middle = (low + high) // 2
+            if index[middle].rpartition(" ")[0] < token:
+                low = middle + 1
+            else:
+                high = middle
+
+        found = []
+        while low < len(index):
+            entry, _, key = index[low].rpartition(" ")
+            if entry != token:
+                break
+            found.append(int(key))
+            low += 1
+
+        return found
+
+    def close(self):
+        self.keys.close()
+        self.index.close()
+
+def _shard_prefix(directory, number):
+    return os.path.join(directory, f"shard-{number:05d}")
+
+def _load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+def _save_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+
+    os.replace(path + ".tmp", path)
+
+def _config_checksum(config):
+    return fingerprint((), config)
+
+class KeyStore:
+    """
+    Reads a key store and finds the key a ciphertext was made with.
+
+    Keys are numbered across shards in the order they were added, so an index
+    recorded in a header stays valid as the store grows. Single-key decoders are
+    built with the `charac_sub` of the store configuration and cached per store.
+    """
+
+    def __init__(self, directory, cache_size=SHARD_CACHE_SIZE, config=None):
+        manifest = _load_manifest(directory)
+
+        if manifest is None:
+            raise Exception(f"ERROR: '{directory}' is not a key store.")
+        if manifest["version"] != STORE_VERSION:
+            raise Exception(f"ERROR: Unsupported key store version {manifest['version']} in '{directory}'.")
+
+        self.config = config or settings.load_settings()
+
+        if manifest["config"] != _config_checksum(self.config):
+            raise Exception(f"ERROR: '{directory}' was built with another configuration.")
+
+        self.directory = directory
+        self.shard_size = manifest["shard_size"]
+        self.counts = manifest["shards"]
+        self.lengths = tuple(manifest["lengths"])
+        self.fingerprint = manifest["fingerprint"]
+        self.bloom_bits = manifest["bloom_bits"]
+        self.cache_size = cache_size
+        self.blooms = [BloomFilter(_shard_prefix(directory, n) + ".bloom") for n in range(len(self.counts))]
+        self._shards = OrderedDict()
+        self._lock = threading.Lock()
+        self.key_decoder = lru_cache(maxsize=KEY_CACHE_SIZE)(self._key_decoder)
+
+    def _key_decoder(self, key):
+        return build_decoder([key], self.config["charac_sub"])
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("key index out of range")
+
+        number, local = divmod(index, self.shard_size)
+        return self._shard(number).keys[local]
+
+    def __iter__(self):
+        for number, count in enumerate(self.counts):
+            keys = self._shard(number).keys
+            for local in range(count):
+                yield keys[local]
+
+    def _shard(self, number):
+        """
+        Returns an open shard, keeping the `cache_size` most recently used ones open.
+        """
+        with self._lock:
+            shard = self._shards.get(number)
+
+            if shard is not None:
+                self._shards.move_to_end(number)
+                return shard
+
+            shard = self._shards[number] = _Shard(_shard_prefix(self.directory, number))
+
+            # Evicted shards are unmapped once no call uses them anymore
+            while len(self._shards) > self.cache_size:
+                self._shards.popitem(last=False)
+
+        return shard
+
+    def lookup(self, token):
+        """
+        Returns the indexes of the keys holding a token, opening only the shards
+        whose Bloom filter may contain it.
+
+        Args:
+            token (str): A substitution token.
+
+        Returns:
+            list: The key indexes, in increasing order.
+        """
+        positions = _positions(token, self.bloom_bits)
+        found = []
+
+        for number, bloom in enumerate(self.blooms):
+            if bloom.contains(positions):
+                count = self.counts[number]
+                found.extend(number * self.shard_size + local
+                             for local in self._shard(number).lookup(token) if local < count)
+
+        return found
+
+    def find_key(self, coded_msg):
+        """
+        Finds the key a noise-free ciphertext was substituted with.
+
+        The first position where a token of the store starts gives the candidate
+        keys; characters before it were left unsubstituted.
+
+        Args:
+            coded_msg (str): The substituted text.
+
+        Returns:
+            int: The index of the key, or None if no token of the store appears in the text.
+        """
+        for position in range(len(coded_msg)):
+            candidates = set()
+            for length in self.lengths:
+                if position + length <= len(coded_msg):
+                    candidates.update(self.lookup(coded_msg[position:position + length]))
+
+            if candidates:
+                window = coded_msg[position:position + VERIFY_LENGTH]
+                return min(candidates, key=lambda index: (len(decode(window, self.key_decoder(self[index]))), index))
+
+        return None
+
+    def decipher(self, coded_msg):
+        """
+        Restores a substituted text, decoding it with the key found by `find_key`.
+
+        Args:
+            coded_msg (str): The text to be decrypted.
+
+        Returns:
+            str: The original text.
+        """
+        if not isinstance(coded_msg, str):
+            raise ValueError("Input must be a string.")
+
+        index = self.find_key(coded_msg)
+        if index is None:
+            return coded_msg
+
+        return decode(coded_msg, self.key_decoder(self[index]))
+
+    def close(self):
+        """
+        Unmaps the Bloom filters and the open shards.
+        """
+        with self._lock:
+            for shard in self._shards.values():
+                shard.close()
+            self._shards.clear()
+
+        for bloom in self.blooms:
+            bloom.close()
+
+def _write_shard(prefix, keys, charac_sub, bloom_bits):
+    """
+    Writes the keys, token index and Bloom filter of a shard, and returns its token lengths.
+    """
+    entries = []
+
+    for local, key in enumerate(keys):
+        tokens = parse_key(key)
+        entries.extend((tokens[n], local) for n in range(len(charac_sub)))
+
+    entries.sort()
+
+    for suffix, lines in ((".keys", keys), (".index", (f"{token} {local}" for token, local in entries))):
+        with KeyLibWriter(prefix + suffix + ".tmp") as writer:
+            for line in lines:
+                writer.write(line)
+
+    BloomFilter.write(prefix + ".bloom.tmp", (token for token, _ in entries), bloom_bits)
+
+    for suffix in (".keys", ".index", ".bloom"):
+        os.replace(prefix + suffix + ".tmp", prefix + suffix)
+
+    return {len(token) for token, _ in entries}
+
+def build_store(directory, keys, shard_size=SHARD_SIZE, config=None):
+    """
+    Writes keys to a key store, creating it or appending to an existing one.
+
+    Keys are written a shard at a time, so only one shard is held in memory. When
+    the store exists, its last shard is filled up first and `shard_size` is the
+    one of the store. The manifest is replaced last, so readers opening the store
+    meanwhile see the keys it had before.
+
+    Args:
+        directory (str): The key store directory.
+        keys (iterable): The key lines to add.
+        shard_size (int): The number of keys per shard of a new store.
+        config (dict): Settings from `load_settings` (default: the default configuration).
+
+    Returns:
+        int: The number of keys in the store.
+    """
+    config = config or settings.load_settings()
+    charac_sub = config["charac_sub"]
+    os.makedirs(directory, exist_ok=True)
+    manifest = _load_manifest(directory)
+
+    if manifest is None:
+        if shard_size < 1:
+            raise ValueError("shard_size must be at least 1.")
+
+        manifest = {
+            "version": STORE_VERSION,
+            "config": _config_checksum(config),
+            "shard_size": shard_size,
+            "bloom_bits": -(-shard_size * len(charac_sub) * BLOOM_BITS_PER_TOKEN // 8) * 8,
+            "lengths": [],
+            "shards": [],
+            "fingerprint": _config_checksum(config),
+        }
+    elif manifest["config"] != _config_checksum(config):
+        raise Exception(f"ERROR: '{directory}' was built with another configuration.")
+
+    shard_size = manifest["shard_size"]
+    lengths = set(manifest["lengths"])
+    value = manifest["fingerprint"]
+    shard = []
+
+    # Start from the keys of an incomplete last shard
+    if manifest["shards"] and manifest["shards"][-1] < shard_size:
+        last = KeyLibrary(_shard_prefix(directory, len(manifest["shards"]) - 1) + ".keys")
+        shard = [last[local] for local in range(manifest["shards"].pop())]
+        last.close()
+
+    def flush():
+        lengths.update(_write_shard(_shard_prefix(directory, len(manifest["shards"])), shard,
+                                    charac_sub, manifest["bloom_bits"]))
+        manifest["shards"].append(len(shard))
+
+    for key in keys:
+        key = key.strip()
+        if not key:
+            continue
+
+        shard.append(key)
+        value = crc32(key.encode("utf-8") + b"\n", value)
+
+        if len(shard) == shard_size:
+            flush()
+            shard = []
+
+    if shard:
+        flush()
+
+    manifest["lengths"] = sorted(lengths, reverse=True)
+    manifest["fingerprint"] = value
+    _save_manifest(directory, manifest)
+
+    return sum(manifest["shards"])
+
+def generate_store(directory, count, shard_size=SHARD_SIZE, batch_size=1000, config=None):
+    """
+    Generates keys with `key_gen_bulk` straight into a key store.
+
+    Args:
+        directory (str): The key store directory.
+        count (int): The number of keys to generate.
+        shard_size (int): The number of keys per shard of a new store.
+        batch_size (int): The number of keys generated at once.
+        config (dict): Settings from `load_settings` (default: the default configuration).
+
+    Returns:
+        int: The number of keys in the store.
+    """
+    from key_generator import key_gen_bulk
+
+    config = config or settings.load_settings()
+
+    def keys():
+        for start in range(0, count, batch_size):
+            yield from key_gen_bulk(min(batch_size, count - start), config)
+
+    return build_store(directory, keys(), shard_size, config)
+
+def store_cipher(msg, store, header=False):
+    """
+    Encrypts a message with a random key of a key store, in the format of `mse_cipher`.
+
+    Args:
+        msg (str): The input message to be encrypted.
+        store (KeyStore): The key store.
+        header (bool): If True, prefixes the ciphertext with a header recording the key used.
+
+    Returns:
+        str: The encrypted message.
+    """
+    if not isinstance(msg, str):
+        raise ValueError("Input must be a string.")
+
+    index = rng.below(len(store))
+    table = key_table(store[index], store.config["charac_sub"])
+
+    a = run_stage("complexify", complexify, msg)
+    b = run_stage("cipher", lambda text: text.translate(table), a)
+    c = run_stage("obscur", lambda text: obscur(text, store.config), b)
+
+    return encode_header(index, store.fingerprint, store.config) + c if header else c
+
+def store_decipher(msg, store):
+    """
+    Decrypts a message encrypted with a key of a key store.
+
+    A header written for the store gives the key directly; otherwise the key is
+    found from the first tokens of the message.
+
+    Args:
+        msg (str): The encrypted message to be decrypted.
+        store (KeyStore): The key store.
+
+    Returns:
+        str: The original message.
+    """
+    if not isinstance(msg, str):
+        raise ValueError("Input must be a string.")
+
+    parsed = parse_header(msg, store.config)
+
+    if parsed and parsed[1] == store.fingerprint and parsed[0] < len(store):
+        index, msg = parsed[0], msg[parsed[2]:]
+    else:
+        index = None
+
+    c = run_stage("remove_group_charac_b", lambda text: remove_group_charac_b(text, store.config), msg)
+
+    if index is None:
+        b = run_stage("decipher", store.decipher, c)
+    else:
+        b = run_stage("decipher", lambda text: decode(text, store.key_decoder(store[index])), c)
+
+    return run_stage("decomplexify", decomplexify, b)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or extend an MSE key store")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("directory")
+    parser.add_argument("--keylib", help="binary key library whose keys are added")
+    parser.add_argument("--generate", type=int, default=0, help="number of keys to generate")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if args.keylib:
+            library = KeyLibrary(args.keylib)
+            build_store(args.directory, library, args.shard_size)
+            library.close()
+        if args.generate:
+            generate_store(args.directory, args.generate, args.shard_size)
+
+    store = KeyStore(args.directory)
+    print(f"{len(store)} keys in {len(store.counts)} shards of {store.shard_size}, "
+          f"fingerprint {store.fingerprint:08x}")
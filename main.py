@@ -3,17 +3,36 @@
 
 """
 Module: Main Interface
-Description: Provides a demonstration and interface for the Multiple Substitution Encryption (MSE) system.
+Description: Provides a demonstration and a command-line interface for the Multiple Substitution Encryption (MSE) system.
 
 Functions:
 - demo(): Demonstrates encryption and decryption using example sentences.
+- process_stdio(mode, chunk_size): Streams stdin to stdout through `encrypt_stream` or `decrypt_stream`.
+- collect_jobs(mode, paths, output): Lists the (source, destination) files for files and directory trees.
+- process_files(mode, jobs, workers, chunk_size): Encrypts or decrypts files, in parallel when several workers are set.
+- main(argv): Command-line entry point.
+
+Usage:
+- python main.py encrypt < message.txt > message.mse
+- python main.py decrypt < message.mse > message.txt
+- python main.py encrypt notes/ report.txt -o encrypted/ --workers 4
+- python main.py decrypt encrypted/ -o notes/
+- python main.py demo
 
 
 """
 
+import argparse
+import io
+import os
+import sys
 from random import choice
-from colorama import Fore, Style
-from MSE import mse_cipher, mse_decipher
+from time import perf_counter
+from MSE import mse_cipher, mse_decipher, warm_up
+from stream import encrypt_file, decrypt_file, encrypt_stream, decrypt_stream, DEFAULT_CHUNK_SIZE
+
+# Suffix of encrypted files
+SUFFIX = ".mse"
 
 # Example sentences for demonstration
 example_sentences = [
@@ -31,6 +50,8 @@ def demo():
     """
     Demonstrates the encryption and decryption process using random example sentences.
     """
+    from colorama import Fore, Style
+
     print("---------- * DEMO * ----------\n")
 
     print(Fore.RED + "Encrypted text:\n" + Style.RESET_ALL)
@@ -41,14 +62,166 @@ def demo():
     print(Fore.GREEN + "Decrypted text:\n" + Style.RESET_ALL)
     print(mse_decipher(message, False))
 
-# Uncomment the following line to run the demo
-#demo()
+def process_stdio(mode, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams stdin to stdout through `encrypt_stream` or `decrypt_stream`.
+
+    Args:
+        mode (str): "encrypt" or "decrypt".
+        chunk_size (int): The number of characters encrypted at once.
+
+    Returns:
+        int: The number of bytes read.
+    """
+    stdin = _CountingReader(sys.stdin.buffer)
+    source = io.BufferedReader(stdin)
+
+    if mode == "encrypt":
+        encrypt_stream(io.TextIOWrapper(source, encoding="utf-8", newline=""), sys.stdout.buffer, chunk_size)
+    else:
+        dst = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="")
+        decrypt_stream(source, dst)
+        dst.flush()
+
+    sys.stdout.flush()
+    return stdin.count
+
+class _CountingReader(io.RawIOBase):
+    """
+    Raw reader counting the bytes read from a binary stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read1(len(buffer))
+        buffer[:len(data)] = data
+        self.count += len(data)
+        return len(data)
+
+def _destination(mode, path):
+    if mode == "encrypt":
+        return path + SUFFIX
+    return path[:-len(SUFFIX)] if path.endswith(SUFFIX) else path + ".txt"
+
+def collect_jobs(mode, paths, output=None):
+    """
+    Lists the (source, destination) files for files and directory trees.
+
+    Directory trees are walked recursively; when encrypting, files already ending in
+    `.mse` are skipped, and when decrypting, only those files are taken. With an
+    output directory the input layout is mirrored inside it, otherwise results are
+    written next to their inputs.
+
+    Args:
+        mode (str): "encrypt" or "decrypt".
+        paths (list): Files and directories.
+        output (str): The output directory, if any.
+
+    Returns:
+        list: (source, destination) pairs.
+    """
+    jobs = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.endswith(SUFFIX) == (mode == "decrypt"):
+                        source = os.path.join(root, filename)
+                        relative = os.path.join(os.path.basename(os.path.normpath(path)), os.path.relpath(source, path))
+                        jobs.append((source, relative))
+        else:
+            jobs.append((path, os.path.basename(path)))
+
+    return [(source, _destination(mode, os.path.join(output, relative) if output else source))
+            for source, relative in jobs]
+
+def _process_file(mode, source, destination, chunk_size):
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+
+    if mode == "encrypt":
+        encrypt_file(source, destination, chunk_size)
+    else:
+        decrypt_file(source, destination)
+
+    return os.path.getsize(source)
+
+def process_files(mode, jobs, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encrypts or decrypts files, in parallel when several workers are set.
+
+    The MSE state is loaded once in this process, or once per worker process,
+    and reused for every file.
+
+    Args:
+        mode (str): "encrypt" or "decrypt".
+        jobs (list): (source, destination) pairs from `collect_jobs`.
+        workers (int): The number of worker processes (1 to stay in-process).
+        chunk_size (int): The number of characters encrypted at once.
+
+    Returns:
+        int: The number of bytes read.
+    """
+    if workers == 1 or len(jobs) < 2:
+        warm_up(mode == "decrypt")
+        return sum(_process_file(mode, source, destination, chunk_size) for source, destination in jobs)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers, initializer=warm_up, initargs=(mode == "decrypt",)) as executor:
+        futures = [executor.submit(_process_file, mode, source, destination, chunk_size) for source, destination in jobs]
+        return sum(future.result() for future in futures)
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    Args:
+        argv (list): The arguments (default: `sys.argv[1:]`).
+
+    Returns:
+        int: The exit status.
+    """
+    parser = argparse.ArgumentParser(description="Multiple Substitution Encryption")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for mode in ("encrypt", "decrypt"):
+        command = commands.add_parser(mode, help=f"{mode} stdin, files or directory trees")
+        command.add_argument("paths", nargs="*", help="files or directories (default: stdin to stdout)")
+        command.add_argument("-o", "--output", help="output directory (default: next to each input)")
+        command.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+        command.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="characters per frame")
+        command.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+
+    commands.add_parser("demo", help="encrypt and decrypt an example sentence")
+    args = parser.parse_args(argv)
+
+    if args.command == "demo":
+        demo()
+        return 0
+
+    start = perf_counter()
+
+    if not args.paths or args.paths == ["-"]:
+        size, count = process_stdio(args.command, args.chunk_size), 1
+    else:
+        jobs = collect_jobs(args.command, args.paths, args.output)
+        size, count = process_files(args.command, jobs, args.workers, args.chunk_size), len(jobs)
+
+    elapsed = perf_counter() - start
 
-# Uncomment these lines to manually encrypt and decrypt a custom message
-# encrypted_message = mse_cipher("Your custom message here", True)
-# print(encrypted_message)
-# print(mse_decipher(encrypted_message, False))
+    if not args.quiet:
+        rate = f", {size / elapsed / 1e6:.2f} MB/s" if size else ""
+        print(f"{args.command}ed {count} input(s) in {elapsed:.2f}s{rate}", file=sys.stderr)
 
-# Uncomment this line to reset encryption keys
-# reset()
+    return 0
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Packing
+Description: Compact binary encoding of MSE ciphertexts for storage and transfer.
+
+A ciphertext is almost entirely made of group A tokens and group B noise, which
+take 3 to 4 bytes per character in UTF-8. The packed form stores each character
+as its index in `group_a + group_b`, in fixed-width little-endian units of 2
+bytes, or 4 bytes for alphabets too large for 16 bits. Indices from 0xD800 on
+are shifted past the UTF-16 surrogate range, so the units are produced and read
+by the C codecs. Characters outside both groups (unsubstituted characters of
+the message) are written as the `ESCAPE` unit followed by their code point.
+
+Within a message every character of the text is substituted with the same
+token, so the units repeat a lot and are compressed with zlib by default. Short
+ciphertexts, where zlib only adds overhead, are stored uncompressed, which the
+flags record.
+
+The packed data starts with `MAGIC`, the format version, the unit width, the
+flags and a CRC-32 of the alphabet, so data packed with another character
+database is rejected instead of decoded into the wrong characters.
+`unpack(pack(text))` returns `text` unchanged, which `mse_decipher` accepts as before.
+
+Functions:
+- pack(text, config, compress): Encodes a ciphertext into its packed form.
+- unpack(data, config): Decodes packed data back into the ciphertext.
+
+
+"""
+
+import struct
+import sys
+import zlib
+from array import array
+from configs import configs_setting as settings
+
+MAGIC = b"MSEP"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBI")
+COMPRESSED = 1
+SURROGATES = 0x800
+ESCAPE = {2: 0xFFFF, 4: 0xFFFFFFFF}
+CODECS = {2: "utf-16-le", 4: "utf-32-le"}
+
+_alphabets = {}
+
+def _code(index):
+    return index if index < 0xD800 else index + SURROGATES
+
+def _alphabet(config):
+    """
+    Returns the encoding tables, the first unused code, the unit width and the
+    CRC-32 of the alphabet of a configuration.
+    """
+    alphabet = config["group_a"] + config["group_b"]
+    cached = _alphabets.get(alphabet)
+
+    if cached is None:
+        limit = _code(len(alphabet))
+        width = 2 if limit < ESCAPE[2] else 4
+        encode = {ord(charac): chr(_code(n)) for n, charac in enumerate(alphabet)}
+        decode = {ord(code): charac for charac, code in zip(alphabet, encode.values())}
+        cached = (encode, decode, dict.fromkeys(encode), limit, width, zlib.crc32(alphabet.encode("utf-8")))
+        _alphabets[alphabet] = cached
+
+    return cached
+
+def _units(width):
+    return array("H" if width == 2 else "I")
+
+def pack(text, config=None, compress=True):
+    """
+    Encodes a ciphertext into its packed form.
+
+    Args:
+        text (str): The ciphertext.
+        config (dict): Settings from `load_settings` (default: the default configuration).
+        compress (bool): If True, compresses the units with zlib when that makes them smaller.
+
+    Returns:
+        bytes: The packed ciphertext.
+    """
+    if not isinstance(text, str):
+        raise ValueError("Input must be a string.")
+
+    encode, _, inside, _, width, checksum = _alphabet(config or settings.load_settings())
+
+    if not text.translate(inside):
+        payload = text.translate(encode).encode(CODECS[width])
+    else:
+        # Write the code point of every character outside the alphabet after an escape unit
+        units = _units(width)
+
+        for charac in text:
+            code = encode.get(ord(charac))
+            if code is not None:
+                units.append(ord(code))
+            elif width == 2:
+                units.extend((ESCAPE[2], ord(charac) >> 16, ord(charac) & 0xFFFF))
+            else:
+                units.extend((ESCAPE[4], ord(charac)))
+
+        if sys.byteorder == "big":
+            units.byteswap()
+
+        payload = units.tobytes()
+
+    flags = 0
+
+    if compress:
+        compressed = zlib.compress(payload)
+        if len(compressed) < len(payload):
+            payload, flags = compressed, COMPRESSED
+
+    return HEADER.pack(MAGIC, VERSION, width, flags, checksum) + payload
+
+def unpack(data, config=None):
+    """
+    Decodes packed data back into the ciphertext.
+
+    Args:
+        data (bytes): Data produced by `pack`.
+        config (dict): The settings the data was packed with.
+
+    Returns:
+        str: The ciphertext.
+    """
+    if len(data) < HEADER.size:
+        raise Exception("ERROR: Packed data is truncated.")
+
+    magic, version, width, flags, checksum = HEADER.unpack_from(data)
+
+    if magic != MAGIC or version != VERSION:
+        raise Exception("ERROR: Not packed MSE data.")
+
+    _, decode, _, limit, expected_width, expected_checksum = _alphabet(config or settings.load_settings())
+
+    if checksum != expected_checksum or width != expected_width:
+        raise Exception("ERROR: Data was packed with another character database.")
+
+    payload = bytes(memoryview(data)[HEADER.size:])
+
+    if flags & COMPRESSED:
+        try:
+            payload = zlib.decompress(payload)
+        except zlib.error:
+            raise Exception("ERROR: Packed data is corrupted.")
+
+    if len(payload) % width:
+        raise Exception("ERROR: Packed data is truncated.")
+
+    # Without escapes, every unit decodes to a code below the limit
+    try:
+        codes = payload.decode(CODECS[width])
+    except UnicodeDecodeError:
+        codes = None
+
+    if codes is not None and (not codes or max(codes) < chr(limit)):
+        return codes.translate(decode)
+
+    units = _units(width)
+    units.frombytes(payload)
+
+    if sys.byteorder == "big":
+        units.byteswap()
+
+    characs = []
+    append = characs.append
+    iterator = iter(units)
+
+    try:
+        for unit in iterator:
+            if unit != ESCAPE[width]:
+                append(decode[unit])
+            elif width == 2:
+                append(chr(next(iterator) << 16 | next(iterator)))
+            else:
+                append(chr(next(iterator)))
+    except (StopIteration, KeyError, ValueError):
+        raise Exception("ERROR: Packed data is corrupted.")
+
+    return ''.join(characs)
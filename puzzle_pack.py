@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Puzzle Pack
+Description: Builds puzzle packs from a text corpus, with resumable checkpoints.
+
+The corpus is either a text file with one sentence per line, or a JSONL file
+whose records hold a `text` field and optionally an `id`. Every sentence is
+encrypted with `mse_cipher` and written to the output as a JSONL record
+`{"id": ..., "puzzle": ...}`, keeping the other fields of JSONL records except
+`text`. Ids default to the line number in the corpus.
+
+Sentences are encrypted in batches, on a pool of worker processes when several
+workers are set. After each batch is written, a checkpoint file next to the
+output records how far the corpus and the output got. An interrupted run started
+again resumes from the checkpoint: the output is truncated back to the last
+checkpointed batch and the corpus is read from the matching offset. The
+checkpoint is removed once the pack is complete.
+
+Functions:
+- read_records(src, offset, line_number): Reads (offset, line number, record) from a corpus.
+- load_checkpoint(path): Reads a checkpoint, if any.
+- save_checkpoint(path, state): Writes a checkpoint atomically.
+- build_pack(src, dst, workers, batch_size, header, checkpoint, progress): Encrypts a corpus into a puzzle pack.
+
+Usage:
+- python puzzle_pack.py corpus.txt -o pack.jsonl [--workers 4 --batch-size 256 --header]
+
+
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from itertools import islice
+from time import perf_counter
+from MSE import mse_cipher, warm_up
+
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+DEFAULT_BATCH_SIZE = 256
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+
+def read_records(src, offset=0, line_number=0):
+    """
+    Reads the records of a corpus from a byte offset.
+
+    Blank lines are skipped but still counted, so ids stay the line numbers.
+
+    Args:
+        src (str): The corpus file, read as JSONL if it ends in `.jsonl` or `.ndjson`.
+        offset (int): The byte offset to start reading from.
+        line_number (int): The number of lines before `offset`.
+
+    Yields:
+        tuple: The byte offset after the line, its line number and its record,
+            a dict with at least `id` and `text`.
+    """
+    jsonl = src.endswith(JSONL_SUFFIXES)
+
+    with open(src, "rb") as file:
+        file.seek(offset)
+
+        for line in file:
+            offset += len(line)
+            line_number += 1
+            text = line.decode("utf-8").rstrip("\r\n")
+
+            if not text.strip():
+                continue
+
+            if jsonl:
+                try:
+                    record = json.loads(text)
+                except ValueError as e:
+                    raise Exception(f"ERROR: Line {line_number} of '{src}' is not valid JSON: {e}")
+
+                if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+                    raise Exception(f"ERROR: Line {line_number} of '{src}' has no text field.")
+
+                record.setdefault("id", line_number)
+            else:
+                record = {"id": line_number, "text": text}
+
+            yield offset, line_number, record
+
+def load_checkpoint(path):
+    """
+    Reads a checkpoint.
+
+    Args:
+        path (str): The checkpoint file.
+
+    Returns:
+        dict: The checkpoint, or None if there is none.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(path, state):
+    """
+    Writes a checkpoint through a temporary file, so it is never left half-written.
+
+    Args:
+        path (str): The checkpoint file.
+        state (dict): The checkpoint.
+    """
+    temporary = path + ".tmp"
+
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(state, file)
+
+    os.replace(temporary, path)
+
+def _encrypt_batch(texts, header):
+    """
+    Encrypts a batch of sentences without touching the clipboard.
+    """
+    return [mse_cipher(text, False, header) for text in texts]
+
+def _batches(records, batch_size):
+    """
+    Groups records into lists of up to `batch_size`.
+    """
+    records = iter(records)
+    batch = list(islice(records, batch_size))
+
+    while batch:
+        yield batch
+        batch = list(islice(records, batch_size))
+
+def build_pack(src, dst, workers=1, batch_size=DEFAULT_BATCH_SIZE, header=False, checkpoint=None, progress=None):
+    """
+    Encrypts a corpus into a puzzle pack, resuming from a checkpoint if one exists.
+
+    Args:
+        src (str): The corpus file.
+        dst (str): The JSONL output file.
+        workers (int): The number of worker processes (1 to stay in-process).
+        batch_size (int): The number of sentences encrypted per task and per checkpoint.
+        header (bool): If True, puzzles carry the key index header (see `header`).
+        checkpoint (str): The checkpoint file (default: `dst` + `.checkpoint.json`).
+        progress (callable): Called with the running report after every batch.
+
+    Returns:
+        dict: The number of records in the pack, those written by this run, the
+            time taken and the records per second of this run.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+
+    checkpoint = checkpoint or dst + CHECKPOINT_SUFFIX
+    state = load_checkpoint(checkpoint)
+    source = os.path.abspath(src)
+
+    if state is None or state.get("input") != source or not os.path.exists(dst):
+        state = {"input": source, "input_offset": 0, "line_number": 0, "records": 0, "output_offset": 0}
+
+    report = {"records": state["records"], "written": 0, "seconds": 0.0, "records_per_second": 0.0}
+    start = perf_counter()
+    batches = _batches(read_records(src, state["input_offset"], state["line_number"]), batch_size)
+
+    with open(dst, "r+b" if state["output_offset"] else "wb") as output:
+        # Drop whatever was written after the last checkpoint
+        output.truncate(state["output_offset"])
+        output.seek(state["output_offset"])
+
+        def write(batch, puzzles):
+            for (_, _, record), puzzle in zip(batch, puzzles):
+                record = {key: value for key, value in record.items() if key != "text"}
+                record["puzzle"] = puzzle
+                output.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+            output.flush()
+            state.update(input_offset=batch[-1][0], line_number=batch[-1][1],
+                         records=state["records"] + len(batch), output_offset=output.tell())
+            save_checkpoint(checkpoint, state)
+
+            report["records"] = state["records"]
+            report["written"] += len(batch)
+            report["seconds"] = perf_counter() - start
+            report["records_per_second"] = report["written"] / report["seconds"] if report["seconds"] else 0.0
+
+            if progress:
+                progress(report)
+
+        if workers == 1:
+            warm_up(False)
+            for batch in batches:
+                write(batch, _encrypt_batch([record["text"] for _, _, record in batch], header))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            pending = deque()
+
+            with ProcessPoolExecutor(workers, initializer=warm_up, initargs=(False,)) as executor:
+                for batch in batches:
+                    texts = [record["text"] for _, _, record in batch]
+                    pending.append((batch, executor.submit(_encrypt_batch, texts, header)))
+
+                    # At most two batches per worker are in flight; results are written in order
+                    if len(pending) >= 2 * workers:
+                        batch, future = pending.popleft()
+                        write(batch, future.result())
+
+                while pending:
+                    batch, future = pending.popleft()
+                    write(batch, future.result())
+
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    report["seconds"] = perf_counter() - start
+    report["records_per_second"] = report["written"] / report["seconds"] if report["seconds"] else 0.0
+
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build an MSE puzzle pack from a corpus")
+    parser.add_argument("corpus", help="one sentence per line, or JSONL records with a text field")
+    parser.add_argument("-o", "--output", required=True, help="JSONL puzzle pack")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="sentences per batch")
+    parser.add_argument("--header", action="store_true", help="record the key index in every puzzle")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not report progress")
+    args = parser.parse_args()
+
+    def show(report):
+        print(f"\r{report['records']} records, {report['records_per_second']:.0f} records/s",
+              end="", file=sys.stderr, flush=True)
+
+    try:
+        result = build_pack(args.corpus, args.output, args.workers, args.batch_size, args.header,
+                            progress=None if args.quiet else show)
+    except KeyboardInterrupt:
+        print("\ninterrupted, run again to resume", file=sys.stderr)
+        sys.exit(130)
+
+    if not args.quiet:
+        print(f"\r{result['records']} records in {args.output}, {result['written']} written in "
+              f"{result['seconds']:.2f}s: {result['records_per_second']:.0f} records/s", file=sys.stderr)
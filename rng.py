@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: RNG
+Description: Pluggable randomness provider serving draws from large pre-filled buffers.
+
+Noise characters, insertion positions and key choices are drawn from a buffer of
+32-bit words filled `buffer_size` words at a time, from `os.urandom` by default or
+from a seeded `random.Random` for reproducible benchmarks. Every thread keeps its
+own buffer (and, when seeded, its own stream), and forked processes start with
+fresh buffers so pool workers never replay the draws of their parent.
+
+The module-level functions use the current provider, which `set_provider` and
+`seed` replace.
+
+Classes:
+- RandomProvider(seed, buffer_size): Buffered uniform draws with per-thread state.
+
+Functions:
+- get_provider(): Returns the current provider.
+- set_provider(provider): Replaces the current provider.
+- seed(value): Installs a provider seeded with `value` (None: back to `os.urandom`).
+- below(bound): Draws an integer in `range(bound)`.
+- indices(count, bound): Draws `count` integers in `range(bound)`.
+- randint(a, b): Draws an integer in `[a, b]`.
+- choice(seq): Draws an element of a sequence.
+- random_string(alphabet, length): Draws a string of `length` characters from `alphabet`.
+- sorted_sample(n, k): Draws `k` distinct integers in `range(n)`, in increasing order.
+
+
+"""
+
+import os
+import threading
+import weakref
+from random import Random
+
+# Number of 32-bit words drawn per buffer refill
+BUFFER_SIZE = 4096
+
+_providers = weakref.WeakSet()
+
+class RandomProvider:
+    """
+    Buffered uniform draws with per-thread state.
+
+    Subclasses may override `fill(state, size)` to plug another source of random
+    bytes (for instance a NumPy `Generator`).
+    """
+
+    def __init__(self, seed=None, buffer_size=BUFFER_SIZE):
+        self.seed = seed
+        self.buffer_size = buffer_size
+        self._streams = 0
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        _providers.add(self)
+
+    def _reset(self):
+        self._local = threading.local()
+
+    def _state(self):
+        local = self._local
+
+        if not hasattr(local, "words"):
+            local.words = memoryview(b"").cast("I")
+            local.position = 0
+
+            if self.seed is not None:
+                with self._lock:
+                    stream = self._streams
+                    self._streams += 1
+                # Forked workers get their own streams instead of replaying the parent's
+                pid = os.getpid()
+                local.random = Random(f"{self.seed}:{stream}" if pid == self._pid else f"{self.seed}:{pid}:{stream}")
+
+        return local
+
+    def fill(self, state, size):
+        """
+        Returns `size` random bytes for a thread state.
+        """
+        if self.seed is None:
+            return os.urandom(size)
+        return state.random.randbytes(size)
+
+    def _take(self, count):
+        state = self._state()
+
+        if state.position >= len(state.words):
+            state.words = memoryview(self.fill(state, 4 * max(count, self.buffer_size))).cast("I")
+            state.position = 0
+
+        words = state.words[state.position:state.position + count]
+        state.position += len(words)
+        return words
+
+    def indices(self, count, bound):
+        """
+        Draws `count` integers in `range(bound)`.
+
+        Words from the incomplete last multiple of `bound` are rejected, so the
+        result has no modulo bias.
+        """
+        if not 0 < bound <= 1 << 32:
+            raise ValueError("Bound must be between 1 and 2**32.")
+
+        limit = (1 << 32) // bound * bound
+        result = []
+
+        while len(result) < count:
+            result.extend(word % bound for word in self._take(count - len(result)) if word < limit)
+
+        return result
+
+    def below(self, bound):
+        """
+        Draws an integer in `range(bound)`.
+        """
+        if not 0 < bound <= 1 << 32:
+            raise ValueError("Bound must be between 1 and 2**32.")
+
+        limit = (1 << 32) // bound * bound
+        state = self._state()
+
+        while True:
+            if state.position >= len(state.words):
+                state.words = memoryview(self.fill(state, 4 * self.buffer_size)).cast("I")
+                state.position = 0
+
+            word = state.words[state.position]
+            state.position += 1
+
+            if word < limit:
+                return word % bound
+
+    def randint(self, a, b):
+        """
+        Draws an integer in `[a, b]`.
+        """
+        return a + self.below(b - a + 1)
+
+    def choice(self, seq):
+        """
+        Draws an element of a non-empty sequence.
+        """
+        return seq[self.below(len(seq))]
+
+    def random_string(self, alphabet, length):
+        """
+        Draws a string of `length` characters from `alphabet` in one buffered draw.
+        """
+        return ''.join(map(alphabet.__getitem__, self.indices(length, len(alphabet))))
+
+    def sorted_sample(self, n, k):
+        """
+        Draws `k` distinct integers in `range(n)`, in increasing order (Floyd's algorithm).
+        """
+        if not 0 <= k <= n:
+            raise ValueError("Sample larger than population or is negative.")
+
+        chosen = set()
+        j = n - k
+
+        # `_take` stops at the end of the buffer, so keep drawing until k values are chosen
+        while j < n:
+            for word in self._take(n - j):
+                bound = j + 1
+                t = word % bound if word < (1 << 32) // bound * bound else self.below(bound)
+                chosen.add(j if t in chosen else t)
+                j += 1
+
+        return sorted(chosen)
+
+_provider = RandomProvider()
+
+def _after_fork():
+    for provider in list(_providers):
+        provider._reset()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+def get_provider():
+    """
+    Returns the current provider.
+    """
+    return _provider
+
+def set_provider(provider):
+    """
+    Replaces the current provider.
+
+    Args:
+        provider (RandomProvider): The provider used by the module-level functions.
+    """
+    global _provider
+    _provider = provider
+
+def seed(value=None):
+    """
+    Installs a provider seeded with `value`, or backed by `os.urandom` when `value` is None.
+
+    Seeded draws are reproducible for each thread, in the order threads first draw.
+    """
+    set_provider(RandomProvider(value))
+
+def below(bound):
+    """
+    Draws an integer in `range(bound)` from the current provider.
+    """
+    return _provider.below(bound)
+
+def indices(count, bound):
+    """
+    Draws `count` integers in `range(bound)` from the current provider.
+    """
+    return _provider.indices(count, bound)
+
+def randint(a, b):
+    """
+    Draws an integer in `[a, b]` from the current provider.
+    """
+    return _provider.randint(a, b)
+
+def choice(seq):
+    """
+    Draws an element of a sequence from the current provider.
+    """
+    return _provider.choice(seq)
+
+def random_string(alphabet, length):
+    """
+    Draws a string of `length` characters from `alphabet` with the current provider.
+    """
+    return _provider.random_string(alphabet, length)
+
+def sorted_sample(n, k):
+    """
+    Draws `k` distinct integers in `range(n)`, in increasing order, from the current provider.
+    """
+    return _provider.sorted_sample(n, k)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Server
+Description: Long-running asyncio encryption service keeping the MSE state warm.
+
+The service speaks newline-delimited JSON over a Unix socket or a localhost TCP port.
+A request is `{"id": ..., "op": "encrypt" | "decrypt", "text": "..."}` and its
+response is `{"id": ..., "result": "..."}` or `{"id": ..., "error": "..."}`.
+Clients may pipeline requests on a connection; responses come back in request order.
+
+The CPU-bound `mse_cipher` / `mse_decipher` calls run on a process pool whose workers
+load the configuration, key library and decoder once. Backpressure is applied at
+three levels: at most `max_in_flight` requests run at once across all connections,
+a connection stops being read once `max_pipeline` of its requests are pending, and
+responses wait for the socket to drain.
+
+Functions:
+- encrypt(text): Encrypts a text without touching the clipboard.
+- decrypt(text): Decrypts a text without touching the clipboard.
+- serve(host, port, path, workers, max_in_flight, max_pipeline): Runs the service until cancelled.
+- load_test(host, port, path, requests, connections, pipeline, text): Measures throughput and latency of a running service.
+
+Usage:
+- python server.py serve [--host 127.0.0.1 --port 8765 | --unix /tmp/mse.sock]
+- python server.py loadtest [--requests 10000 --connections 8 --pipeline 16]
+
+
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from time import perf_counter
+from MSE import mse_cipher, mse_decipher, warm_up
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_IN_FLIGHT = 256
+MAX_PIPELINE = 64
+MAX_REQUEST_SIZE = 1 << 24
+
+def encrypt(text):
+    """
+    Encrypts a text without touching the clipboard.
+    """
+    return mse_cipher(text, False)
+
+def decrypt(text):
+    """
+    Decrypts a text without touching the clipboard.
+    """
+    return mse_decipher(text, False)
+
+OPERATIONS = {"encrypt": encrypt, "decrypt": decrypt}
+
+async def _run(executor, slots, operation, text):
+    async with slots:
+        return await asyncio.get_running_loop().run_in_executor(executor, OPERATIONS[operation], text)
+
+def _validate(request):
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object.")
+    if request.get("op") not in OPERATIONS:
+        raise ValueError(f"Unknown operation {request.get('op')!r}.")
+    if not isinstance(request.get("text"), str):
+        raise ValueError("Request text must be a string.")
+
+async def _handle(reader, writer, executor, slots, max_pipeline):
+    """
+    Serves one connection: reads pipelined requests and writes responses in order.
+
+    If the client goes away, the pending requests are cancelled and the connection
+    closed, so neither side of the handler is left waiting.
+    """
+    pending = asyncio.Queue()
+    window = asyncio.Semaphore(max_pipeline)
+
+    async def respond():
+        connected = True
+
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+
+            request_id, task = item
+            try:
+                if not connected:
+                    task.cancel()
+                    continue
+
+                try:
+                    response = {"id": request_id, "result": await task}
+                except Exception as e:
+                    response = {"id": request_id, "error": str(e)}
+
+                try:
+                    writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                    await writer.drain()
+                except ConnectionError:
+                    # Closing the transport ends the read loop; the queue is still emptied
+                    connected = False
+                    writer.close()
+            finally:
+                window.release()
+
+    responder = asyncio.create_task(respond())
+
+    try:
+        while True:
+            # Waits once max_pipeline requests are pending, which stops reading the socket
+            await window.acquire()
+
+            try:
+                line = await reader.readline()
+            except ValueError:
+                pending.put_nowait((None, _failed(ValueError("Request too large."))))
+                break
+            except ConnectionError:
+                line = b""
+
+            if not line:
+                window.release()
+                break
+            if not line.strip():
+                window.release()
+                continue
+
+            request = None
+            try:
+                request = json.loads(line)
+                _validate(request)
+                request_id = request.get("id")
+                task = asyncio.create_task(_run(executor, slots, request["op"], request["text"]))
+            except Exception as e:
+                request_id = request.get("id") if isinstance(request, dict) else None
+                task = _failed(e)
+
+            pending.put_nowait((request_id, task))
+    except BaseException:
+        responder.cancel()
+        raise
+    finally:
+        # The queue is unbounded, so ending the responder never blocks
+        pending.put_nowait(None)
+        await asyncio.gather(responder, return_exceptions=True)
+        writer.close()
+
+def _failed(exception):
+    future = asyncio.get_running_loop().create_future()
+    future.set_exception(exception)
+    return future
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, workers=None,
+                max_in_flight=MAX_IN_FLIGHT, max_pipeline=MAX_PIPELINE, watch_interval=None):
+    """
+    Runs the service until cancelled.
+
+    Args:
+        host (str): The TCP host, ignored when `path` is set.
+        port (int): The TCP port, ignored when `path` is set.
+        path (str): A Unix socket path to listen on instead of TCP.
+        workers (int): The number of worker processes (default: CPU count).
+        max_in_flight (int): The maximum number of requests running at once.
+        max_pipeline (int): The maximum number of pending requests per connection.
+        watch_interval (float): If set, workers reload the key library when its file
+            changes, polling every `watch_interval` seconds.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers, initializer=warm_up, initargs=(True, watch_interval)) as executor:
+        slots = asyncio.Semaphore(max_in_flight)
+
+        def handler(reader, writer):
+            return _handle(reader, writer, executor, slots, max_pipeline)
+
+        if path:
+            server = await asyncio.start_unix_server(handler, path, limit=MAX_REQUEST_SIZE)
+        else:
+            server = await asyncio.start_server(handler, host, port, limit=MAX_REQUEST_SIZE)
+
+        async with server:
+            await server.serve_forever()
+
+async def _open(host, port, path):
+    if path:
+        return await asyncio.open_unix_connection(path, limit=MAX_REQUEST_SIZE)
+    return await asyncio.open_connection(host, port, limit=MAX_REQUEST_SIZE)
+
+async def load_test(host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, requests=10000, connections=8,
+                    pipeline=16, text="The sign said there was road work ahead so he decided to speed up."):
+    """
+    Measures throughput and latency of a running service.
+
+    Each connection keeps up to `pipeline` round trips in flight: every encrypt
+    response is decrypted by a follow-up request and checked against `text`.
+
+    Args:
+        host (str): The TCP host, ignored when `path` is set.
+        port (int): The TCP port, ignored when `path` is set.
+        path (str): A Unix socket path to connect to instead of TCP.
+        requests (int): The total number of requests (half encrypt, half decrypt).
+        connections (int): The number of concurrent connections.
+        pipeline (int): The number of round trips in flight per connection.
+        text (str): The text encrypted by every request.
+
+    Returns:
+        dict: Requests per second and p50/p99 latency in milliseconds.
+    """
+    latencies = []
+
+    async def client(count):
+        reader, writer = await _open(host, port, path)
+        window = asyncio.Semaphore(pipeline)
+        sent = {}
+
+        async def send(request_id, operation, payload):
+            sent[request_id] = perf_counter()
+            writer.write(json.dumps({"id": request_id, "op": operation, "text": payload}).encode("utf-8") + b"\n")
+            await writer.drain()
+
+        async def receive():
+            done = 0
+            while done < count:
+                response = json.loads(await reader.readline())
+                latencies.append(perf_counter() - sent.pop(response["id"]))
+                done += 1
+
+                if "error" in response:
+                    raise Exception(f"ERROR: {response['error']}")
+                if response["id"] % 2 == 0:
+                    # The round trip keeps its window slot for the decrypt request
+                    await send(response["id"] + 1, "decrypt", response["result"])
+                elif response["result"] != text:
+                    raise Exception("ERROR: Round trip mismatch.")
+                else:
+                    window.release()
+
+        receiver = asyncio.create_task(receive())
+        for request_id in range(0, count, 2):
+            await window.acquire()
+            await send(request_id, "encrypt", text)
+        await receiver
+        writer.close()
+
+    per_connection = max(2, requests // connections // 2 * 2)
+    start = perf_counter()
+    await asyncio.gather(*(client(per_connection) for _ in range(connections)))
+    elapsed = perf_counter() - start
+    latencies.sort()
+
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MSE encryption service")
+    parser.add_argument("command", choices=["serve", "loadtest"])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="Unix socket path (instead of TCP)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT)
+    parser.add_argument("--max-pipeline", type=int, default=MAX_PIPELINE)
+    parser.add_argument("--watch-keylib", type=float, metavar="SECONDS", help="reload the key library when it changes")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--pipeline", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.max_in_flight, args.max_pipeline,
+                              args.watch_keylib))
+        except KeyboardInterrupt:
+            pass
+    else:
+        report = asyncio.run(load_test(args.host, args.port, args.unix, args.requests, args.connections, args.pipeline))
+        print(f"{report['requests']} requests in {report['seconds']:.2f}s: "
+              f"{report['requests_per_second']:.0f} req/s, p50 {report['p50_ms']:.2f}ms, p99 {report['p99_ms']:.2f}ms")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module: Stream
+Description: Encrypts and decrypts files of any size with bounded memory.
+
+The input is read in chunks of about `chunk_size` characters. Each chunk is cut
+right after a space so no word is split, then encrypted on its own with
+`mse_cipher`. The output starts with `MAGIC`, followed by one frame per chunk:
+the UTF-8 length of the ciphertext as a little-endian uint64, then the ciphertext.
+
+Functions:
+- read_chunks(src, chunk_size): Reads text in chunks that end on a word boundary.
+- encrypt_stream(src, dst, chunk_size): Encrypts a text stream into a framed binary stream.
+- decrypt_stream(src, dst): Decrypts a framed binary stream into a text stream.
+- encrypt_file(src_path, dst_path, chunk_size): Encrypts a file into a framed file.
+- decrypt_file(src_path, dst_path): Decrypts a framed file.
+
+
+"""
+
+import struct
+from MSE import mse_cipher, mse_decipher
+
+MAGIC = b"MSES\x01"
+FRAME = struct.Struct("<Q")
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+def read_chunks(src, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Reads text in chunks that end on a word boundary.
+
+    A chunk ends right after its last space, and the remainder is carried over to
+    the next chunk. A run of `chunk_size` characters without any space is cut as is.
+
+    Args:
+        src (file): A text stream.
+        chunk_size (int): The number of characters read at once.
+
+    Yields:
+        str: Chunks of the input, which join back into the full text.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    carry = ""
+
+    while True:
+        data = src.read(chunk_size)
+
+        if not data:
+            break
+
+        data = carry + data
+        cut = data.rfind(" ") + 1
+
+        if cut == 0 and len(data) < 2 * chunk_size:
+            carry = data
+            continue
+        if cut == 0:
+            cut = len(data)
+
+        carry = data[cut:]
+        yield data[:cut]
+
+    if carry:
+        yield carry
+
+def encrypt_stream(src, dst, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encrypts a text stream into a framed binary stream.
+
+    Args:
+        src (file): A text stream.
+        dst (file): A binary stream.
+        chunk_size (int): The number of characters encrypted at once.
+
+    Returns:
+        int: The number of frames written.
+    """
+    dst.write(MAGIC)
+    frames = 0
+
+    for chunk in read_chunks(src, chunk_size):
+        data = mse_cipher(chunk, False).encode("utf-8")
+        dst.write(FRAME.pack(len(data)))
+        dst.write(data)
+        frames += 1
+
+    return frames
+
+def decrypt_stream(src, dst):
+    """
+    Decrypts a framed binary stream into a text stream, one frame at a time.
+
+    Args:
+        src (file): A binary stream written by `encrypt_stream`.
+        dst (file): A text stream.
+
+    Returns:
+        int: The number of frames read.
+    """
+    if src.read(len(MAGIC)) != MAGIC:
+        raise Exception("ERROR: Input is not an MSE stream.")
+
+    frames = 0
+
+    while True:
+        header = src.read(FRAME.size)
+
+        if not header:
+            break
+        if len(header) < FRAME.size:
+            raise Exception("ERROR: Truncated MSE stream.")
+
+        size, = FRAME.unpack(header)
+        data = src.read(size)
+
+        if len(data) < size:
+            raise Exception("ERROR: Truncated MSE stream.")
+
+        dst.write(mse_decipher(data.decode("utf-8"), False))
+        frames += 1
+
+    return frames
+
+def encrypt_file(src_path, dst_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encrypts a file into a framed file.
+
+    Args:
+        src_path (str): The text file to encrypt.
+        dst_path (str): The framed file to write.
+        chunk_size (int): The number of characters encrypted at once.
+
+    Returns:
+        int: The number of frames written.
+    """
+    with open(src_path, "r", encoding="utf-8", newline="") as src, open(dst_path, "wb") as dst:
+        return encrypt_stream(src, dst, chunk_size)
+
+def decrypt_file(src_path, dst_path):
+    """
+    Decrypts a framed file.
+
+    Args:
+        src_path (str): The framed file written by `encrypt_file`.
+        dst_path (str): The text file to write.
+
+    Returns:
+        int: The number of frames read.
+    """
+    with open(src_path, "rb") as src, open(dst_path, "w", encoding="utf-8", newline="") as dst:
+        return decrypt_stream(src, dst)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the key library snapshots of Block B.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import bloc_b
+from key_generator import key_gen_bulk
+from keylib import KeyLibrary, KeyLibWriter
+
+class KeyLibraryUpdateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "keylib.bin")
+        shutil.copy(bloc_b.get_snapshot().keys.path, self.path)
+        self.previous = bloc_b._snapshot
+        bloc_b._snapshot = bloc_b.KeySnapshot(KeyLibrary(self.path))
+
+    def tearDown(self):
+        bloc_b._snapshot = self.previous
+        shutil.rmtree(self.directory)
+
+    def test_append_extends_decoder(self):
+        snapshot = bloc_b.get_snapshot()
+        snapshot.decoder
+        keys = key_gen_bulk(3)
+
+        appended = bloc_b.append_keys(keys)
+
+        self.assertEqual(len(appended.keys), len(snapshot.keys) + 3)
+        self.assertEqual(appended.decoder, bloc_b.build_decoder(appended.keys))
+        self.assertEqual(bloc_b.decipher(bloc_b.cipher_with_key("abc", len(appended.keys) - 1)), "abc")
+
+    def test_bad_key_leaves_library_unchanged(self):
+        snapshot = bloc_b.get_snapshot()
+        snapshot.decoder
+        size = os.path.getsize(self.path)
+
+        for update in (bloc_b.append_keys, bloc_b.replace_keys):
+            with self.assertRaises(ValueError):
+                update(key_gen_bulk(1) + ["tooshort key"])
+
+        self.assertIs(bloc_b.get_snapshot(), snapshot)
+        self.assertEqual(os.path.getsize(self.path), size)
+        self.assertEqual(len(bloc_b.reload_key_list().keys), len(snapshot.keys))
+
+    def test_reload_keeps_snapshot_on_incomplete_file(self):
+        snapshot = bloc_b.get_snapshot()
+
+        # A library being written in place still has its placeholder header
+        writer = KeyLibWriter(self.path)
+        writer.write(key_gen_bulk(1)[0])
+        writer.file.flush()
+
+        try:
+            with self.assertRaises(Exception):
+                bloc_b.reload_key_list()
+        finally:
+            writer.close()
+
+        self.assertIs(bloc_b.get_snapshot(), snapshot)
+        self.assertEqual(len(bloc_b.reload_key_list().keys), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the noise added and removed by Block C.
+"""
+
+import unittest
+import rng
+import bloc_b
+import bloc_c
+from configs import configs_setting as settings
+
+class ObscurRecoveryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = rng.get_provider()
+        rng.seed(1234)
+        self.config = settings.load_settings()
+
+    def tearDown(self):
+        rng.set_provider(self.previous)
+
+    def assertRecovered(self, text):
+        for _ in range(20):
+            self.assertEqual(bloc_c.remove_group_charac_b(bloc_c.obscur(text)), text)
+
+    def test_empty_input(self):
+        self.assertRecovered("")
+
+    def test_single_word(self):
+        self.assertRecovered("word")
+
+    def test_group_a_text(self):
+        group_a = self.config["group_a"]
+        self.assertRecovered(group_a[:3])
+        self.assertRecovered(rng.random_string(group_a, 5000))
+
+    def test_input_containing_group_b(self):
+        # Characters from group_b are noise by definition: they are stripped with the rest
+        group_b = self.config["group_b"]
+        text = "ab" + group_b[:4] + "cd" + group_b[-1]
+        self.assertEqual(bloc_c.remove_group_charac_b(bloc_c.obscur(text)), "abcd")
+
+    def test_cipher_output_has_no_group_b(self):
+        # So obscur never receives group_b characters from the pipeline
+        coded = bloc_b.cipher("Hello, world! " * 20)
+        self.assertTrue(set(coded).isdisjoint(self.config["group_b"]))
+        self.assertEqual(bloc_c.remove_group_charac_b(bloc_c.obscur(coded)), coded)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the compiled character database artifact.
+"""
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest import mock
+from configs.charac_db import compiled_path, compile_charac_db, load_charac_db
+from tools import get_mse_hash
+
+CHARAC_SUB = "abc "
+
+class CompiledCharacDbTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.src = os.path.join(self.directory, "db.txt")
+
+        with open(self.src, "w", encoding="utf-8") as file:
+            file.write("xaybzx\nwvu")
+
+    def tearDown(self):
+        os.chmod(self.directory, stat.S_IRWXU)
+        shutil.rmtree(self.directory)
+
+    def test_compile(self):
+        compiled = compile_charac_db(self.src, CHARAC_SUB)
+
+        self.assertEqual(compiled["group_a"] + compiled["group_b"], "xyzwvu")
+        self.assertEqual(load_charac_db(self.src, CHARAC_SUB), compiled)
+
+    def test_touch_keeps_artifact_and_hash(self):
+        compiled = load_charac_db(self.src, CHARAC_SUB)
+        before = get_mse_hash(self.directory, None)
+
+        os.utime(self.src, ns=(1, 1))
+
+        with mock.patch("configs.charac_db.compile_charac_db", side_effect=AssertionError("recompiled")):
+            touched = load_charac_db(self.src, CHARAC_SUB)
+
+        self.assertEqual(touched["mtime_ns"], 1)
+        self.assertEqual(touched["group_a"] + touched["group_b"], compiled["group_a"] + compiled["group_b"])
+        self.assertEqual(get_mse_hash(self.directory, None), before)
+
+    def test_unchanged_source_is_not_hashed(self):
+        load_charac_db(self.src, CHARAC_SUB)
+
+        with mock.patch("configs.charac_db.sha256", side_effect=AssertionError("hashed")):
+            self.assertEqual(load_charac_db(self.src, CHARAC_SUB)["group_b"], "wvu")
+
+    def test_source_change_recompiles(self):
+        load_charac_db(self.src, CHARAC_SUB)
+
+        with open(self.src, "w", encoding="utf-8") as file:
+            file.write("xaybzx\nwvt")
+
+        self.assertEqual(load_charac_db(self.src, CHARAC_SUB)["group_b"], "wvt")
+
+    @unittest.skipIf(hasattr(os, "geteuid") and os.geteuid() == 0, "root ignores directory permissions")
+    def test_read_only_directory(self):
+        os.chmod(self.directory, stat.S_IRUSR | stat.S_IXUSR)
+
+        compiled = load_charac_db(self.src, CHARAC_SUB)
+
+        self.assertEqual(compiled["group_a"], "xyz")
+        self.assertFalse(os.path.exists(compiled_path(self.src)))
+
+    def test_unwritable_artifact(self):
+        dst = os.path.join(self.directory, "missing", "db.compiled.json")
+
+        compiled = compile_charac_db(self.src, CHARAC_SUB, dst)
+
+        self.assertEqual(compiled["group_b"], "wvu")
+        self.assertEqual(os.listdir(self.directory), ["db.txt"])
+
+if __name__ == "__main__":
+    unittest.main()
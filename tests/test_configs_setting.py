@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the configuration cache.
+"""
+
+import os
+import unittest
+from unittest import mock
+from configs import configs_setting
+from configs.configs_setting import load_settings, SETTINGS_PATH, SETTINGS_CACHE_SIZE, SETTING_NAMES
+from engine import MSEEngine
+
+class SettingsCacheTest(unittest.TestCase):
+
+    def test_one_entry_per_file(self):
+        self.assertIs(load_settings(), load_settings(SETTINGS_PATH))
+        self.assertIs(load_settings(), load_settings(os.path.join(".", "configs", "setting.json")))
+        self.assertIs(load_settings(), load_settings(os.path.abspath(SETTINGS_PATH)))
+
+    def test_cache_is_bounded(self):
+        self.assertEqual(configs_setting._load_cached.cache_info().maxsize, SETTINGS_CACHE_SIZE)
+
+    def test_engine_settings_are_not_cached(self):
+        load_settings()
+        cached = configs_setting._load_cached.cache_info().currsize
+        engine = MSEEngine()
+
+        self.assertIsNot(engine.config, load_settings())
+        self.assertEqual(configs_setting._load_cached.cache_info().currsize, cached)
+
+class ModuleAttributeTest(unittest.TestCase):
+
+    def test_setting_names(self):
+        self.assertEqual(set(load_settings()), SETTING_NAMES)
+        self.assertIs(configs_setting.group_b, load_settings()["group_b"])
+
+    def test_unknown_names_do_not_load(self):
+        with mock.patch.object(configs_setting, "load_settings", side_effect=AssertionError("loaded")):
+            self.assertFalse(hasattr(configs_setting, "__wrapped__"))
+            self.assertFalse(hasattr(configs_setting, "missing_setting"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the fused single-pass encryption.
+"""
+
+import unittest
+from unittest import mock
+import fused
+from bloc_a import complexify
+from bloc_b import compile_key, get_key_list
+from bloc_c import remove_group_charac_b
+from fused import fused_cipher
+from MSE import mse_decipher
+
+MESSAGES = ("", "a", " ", "  two  spaces ", "Hello, World!", "The quick brown fox jumps over the lazy dog. " * 50)
+
+class FusedCipherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = compile_key(get_key_list()[0])
+
+    def assertStaged(self, msg):
+        coded = fused_cipher(msg, table=self.table)
+        self.assertEqual(remove_group_charac_b(coded), complexify(msg).translate(self.table))
+        self.assertEqual(mse_decipher(coded), msg)
+
+    def test_matches_staged_pipeline(self):
+        for msg in MESSAGES:
+            self.assertStaged(msg)
+
+    def test_chunk_boundaries(self):
+        # Chunks shorter than some words, with spaces on both sides of the cuts
+        with mock.patch.object(fused, "CHUNK_SIZE", 7), mock.patch.object(fused, "MEMO_SIZE", 3):
+            for msg in MESSAGES + ("averyveryverylongword and more  words  ",):
+                self.assertStaged(msg)
+
+if __name__ == "__main__":
+    unittest.main()
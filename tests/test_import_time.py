@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests that importing MSE stays cheap: nothing is loaded until first use.
+"""
+
+import subprocess
+import sys
+import unittest
+from benchmark import bench_import_time, IMPORT_BUDGET
+
+class ImportTimeTest(unittest.TestCase):
+
+    def test_import_loads_nothing(self):
+        code = ("import sys, MSE, bloc_b; "
+                "from configs import configs_setting; "
+                "assert bloc_b._snapshot is None; "
+                "assert configs_setting._load_cached.cache_info().currsize == 0; "
+                "assert 'pyperclip' not in sys.modules")
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_import_time_budget(self):
+        # Best of three cold imports, so one slow start does not fail the test
+        rows = [bench_import_time("MSE", IMPORT_BUDGET) for _ in range(3)]
+        best = min(rows, key=lambda row: row["cumulative"])
+
+        self.assertGreater(best["cumulative"], 0)
+        self.assertTrue(best["ok"], f"import MSE took {best['cumulative']}us, budget {IMPORT_BUDGET}us")
+
+if __name__ == "__main__":
+    unittest.main()
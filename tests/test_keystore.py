@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the sharded key store.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from configs.configs_setting import read_settings, SETTINGS_PATH
+from keystore import KeyStore, generate_store, store_cipher, store_decipher
+
+class KeyStoreProfileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+        with open(SETTINGS_PATH, "r", encoding="utf-8") as file:
+            config_data = json.load(file)
+
+        # A profile whose substituted characters differ from the default configuration
+        config_data.update(cipher="ascii_lowercase", cipher_punctuation="False", cipher_accent="False",
+                           cipher_digits="False", substitue_with=os.path.abspath(config_data["substitue_with"]))
+        path = os.path.join(self.directory, "setting.json")
+
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(config_data, file)
+
+        self.config = read_settings(path)
+        self.store_path = os.path.join(self.directory, "store")
+        generate_store(self.store_path, 20, shard_size=8, config=self.config)
+        self.store = KeyStore(self.store_path, config=self.config)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_round_trip_with_profile(self):
+        msg = "hello world from another profile"
+
+        for header in (False, True):
+            self.assertEqual(store_decipher(store_cipher(msg, self.store, header), self.store), msg)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the packed ciphertext encoding.
+"""
+
+import unittest
+import rng
+from bloc_c import obscur
+from configs import configs_setting as settings
+from packing import COMPRESSED, HEADER, pack, unpack
+
+class PackingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config = settings.load_settings()
+
+    def flags(self, data):
+        return HEADER.unpack_from(data)[3]
+
+    def test_short_text_stays_uncompressed(self):
+        text = self.config["group_a"][:2]
+        packed = pack(text)
+
+        self.assertFalse(self.flags(packed) & COMPRESSED)
+        self.assertEqual(len(packed), len(pack(text, compress=False)))
+        self.assertEqual(unpack(packed), text)
+
+    def test_long_text_is_compressed(self):
+        text = obscur(self.config["group_a"][:5] * 2000)
+        packed = pack(text)
+
+        self.assertTrue(self.flags(packed) & COMPRESSED)
+        self.assertLess(len(packed), len(pack(text, compress=False)))
+        self.assertEqual(unpack(packed), text)
+
+    def test_round_trip(self):
+        for text in ("", rng.random_string(self.config["group_a"] + self.config["group_b"], 300)):
+            for compress in (True, False):
+                self.assertEqual(unpack(pack(text, compress=compress)), text)
+
+    def test_escapes(self):
+        text = self.config["group_a"][:3] + "a\U0001F600 " + self.config["group_b"][:3]
+        for compress in (True, False):
+            self.assertEqual(unpack(pack(text, compress=compress)), text)
+
+if __name__ == "__main__":
+    unittest.main()
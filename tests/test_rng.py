@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the buffered randomness provider.
+"""
+
+import unittest
+from rng import RandomProvider
+
+class SortedSampleTest(unittest.TestCase):
+
+    def test_sample_size_across_buffer_refills(self):
+        provider = RandomProvider(seed=0, buffer_size=64)
+
+        # 8 draws per call do not divide the buffer evenly, so calls straddle refills
+        for n in range(3000):
+            sample = provider.sorted_sample(100, 8 + n % 3)
+            self.assertEqual(len(sample), 8 + n % 3)
+            self.assertEqual(sample, sorted(set(sample)))
+            self.assertTrue(all(0 <= value < 100 for value in sample))
+
+    def test_sample_whole_population(self):
+        provider = RandomProvider(seed=0, buffer_size=16)
+        self.assertEqual(provider.sorted_sample(50, 50), list(range(50)))
+
+    def test_sample_after_partial_buffer(self):
+        provider = RandomProvider(seed=0, buffer_size=4096)
+        provider.indices(4090, 10)
+        self.assertEqual(len(provider.sorted_sample(100, 8)), 8)
+
+if __name__ == "__main__":
+    unittest.main()
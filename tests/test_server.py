@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the connection handler of the encryption service.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import server
+
+def slow_encrypt(text):
+    time.sleep(0.01)
+    return text[::-1]
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires Unix sockets")
+class ConnectionHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "mse.sock")
+        self.executor = ThreadPoolExecutor(2)
+        patcher = mock.patch.dict(server.OPERATIONS, {"encrypt": slow_encrypt})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        shutil.rmtree(self.directory)
+
+    def run_with_server(self, client, max_pipeline=4):
+        handlers = []
+
+        async def main():
+            slots = asyncio.Semaphore(server.MAX_IN_FLIGHT)
+
+            async def handler(reader, writer):
+                handlers.append(asyncio.current_task())
+                await server._handle(reader, writer, self.executor, slots, max_pipeline)
+
+            listener = await asyncio.start_unix_server(handler, self.path)
+            async with listener:
+                result = await client()
+                # Every handler must end on its own once the client is gone
+                await asyncio.wait_for(asyncio.gather(*handlers), 5)
+                return result
+
+        return asyncio.run(main())
+
+    def requests(self, count):
+        return b"".join(json.dumps({"id": n, "op": "encrypt", "text": f"text {n}"}).encode("utf-8") + b"\n"
+                        for n in range(count))
+
+    def test_responses_in_order(self):
+        async def client():
+            reader, writer = await asyncio.open_unix_connection(self.path)
+            writer.write(self.requests(10))
+            writer.write_eof()
+            responses = [json.loads(line) for line in (await reader.read()).splitlines()]
+            writer.close()
+            return responses
+
+        responses = self.run_with_server(client)
+        self.assertEqual(responses, [{"id": n, "result": f"text {n}"[::-1]} for n in range(10)])
+
+    def test_client_abort_with_pending_requests(self):
+        async def client():
+            reader, writer = await asyncio.open_unix_connection(self.path)
+            writer.write(self.requests(50))
+            await writer.drain()
+            await reader.readline()
+            writer.transport.abort()
+
+        self.run_with_server(client)
+
+if __name__ == "__main__":
+    unittest.main()
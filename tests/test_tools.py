@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the project hash.
+"""
+
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+from tools import get_mse_hash
+
+class ProjectHashTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+        with open(os.path.join(self.directory, "a.py"), "w", encoding="utf-8") as file:
+            file.write("print('a')\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @unittest.skipUnless(hasattr(os, "mkfifo") and hasattr(socket, "AF_UNIX"), "requires FIFOs and Unix sockets")
+    def test_special_files_are_skipped(self):
+        expected = get_mse_hash(self.directory, None)
+
+        os.mkfifo(os.path.join(self.directory, "pipe"))
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(server.close)
+        server.bind(os.path.join(self.directory, "mse.sock"))
+        os.symlink(os.path.join(self.directory, "missing"), os.path.join(self.directory, "broken"))
+
+        self.assertEqual(get_mse_hash(self.directory, None), expected)
+
+    def test_content_changes_hash(self):
+        expected = get_mse_hash(self.directory, None)
+
+        with open(os.path.join(self.directory, "a.py"), "a", encoding="utf-8") as file:
+            file.write("print('b')\n")
+
+        self.assertNotEqual(get_mse_hash(self.directory, None), expected)
+
+if __name__ == "__main__":
+    unittest.main()
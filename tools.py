@@ -10,25 +10,41 @@ Functions:
 - mixer(): Shuffles characters in the current substitution file.
 - rebuild(): Cleans and rebuilds the special characters file by removing duplicates.
 - gen_db_text(name, length): Generates a text database file with specified length.
-- get_mse_hash(): Computes a hash of the entire project for integrity checks.
+- hash_file(path): Computes the sha3_512 digest of a file, reading it in blocks.
+- get_mse_hash(root, cache_path): Computes a hash of the entire project for integrity checks.
 - first_mixer(): Initializes character mixing and parameter generation for first-time users.
 
+Usage:
+- python tools.py (runs `first_mixer()`)
+
 
 """
 
 import os
 from random import shuffle, randint
 import shutil
-from configs.configs_setting import name, charac_sub
+from configs import configs_setting as settings
 from settings_generator import get_random_setting
 from hashlib import sha3_512
-from colorama import Fore, Style
+from stat import S_ISREG
+import json
+
+# Files and directories left out of the project hash
+HASH_EXCLUDED_FILES = {"requirement.txt", "user.data", "user.txt", "README.md", "keylib.txt", "keylib.bin",
+                       "benchmark.json", ".mse_hash_cache.json"}
+HASH_EXCLUDED_DIRS = {".git", "__pycache__", ".pytest_cache", ".mypy_cache", ".ruff_cache", ".tox", ".nox",
+                      ".venv", "venv"}
+# Generated artifacts, rebuilt from files that are hashed
+HASH_EXCLUDED_SUFFIXES = (".compiled.json",)
+HASH_MAX_FILE_SIZE = 16 * 1024 * 1024
+HASH_CACHE_PATH = ".mse_hash_cache.json"
+HASH_BLOCK_SIZE = 1 << 20
 
 def reset():
     """
     Removes temporary files and caches to clean the project directory.
     """
-    files_to_remove = ["keylib.txt", "user.data", "configs/light_weight.txt", "configs/ultra_light_weight.txt", "configs/perso.txt"]
+    files_to_remove = ["keylib.txt", "keylib.bin", "user.data", "configs/light_weight.txt", "configs/ultra_light_weight.txt", "configs/perso.txt"]
     
     for file in files_to_remove:
         if os.path.exists(file):
@@ -48,6 +64,8 @@ def mixer():
     """
     reset()
 
+    name = settings.substitute_file
+
     with open(name, "r", encoding="utf-8") as file:
         init = list(file.read())
 
@@ -62,13 +80,15 @@ def rebuild():
     """
     reset()
 
+    name, charac_sub = settings.substitute_file, settings.charac_sub
+
     with open(name, "r", encoding="utf-8") as file:
         old_carac = file.read()
 
     new_carac = [e for e in old_carac if e not in charac_sub and e not in "\n"]
 
     with open(name, "w", encoding="utf-8") as file:
-        file.write("".join(set(new_carac)))
+        file.write("".join(dict.fromkeys(new_carac)))
 
 def gen_db_text(name, length=3000):
     """
@@ -85,28 +105,92 @@ def gen_db_text(name, length=3000):
     with open(f"configs/{name}", "w", encoding="utf-8") as file:
         file.write(new_data)
 
-def get_mse_hash():
+def hash_file(path):
+    """
+    Computes the sha3_512 digest of a file, reading it in blocks.
+
+    Args:
+        path (str): The file to hash.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = sha3_512()
+
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+def get_mse_hash(root=None, cache_path=HASH_CACHE_PATH):
     """
     Computes a hash for the project files to ensure integrity.
 
+    Files are visited in sorted order and each one contributes its relative path and
+    its own digest to an incremental sha3_512. Per-file digests are cached on
+    (path, size, mtime), so hashing an unchanged tree only costs a `stat` per file.
+    Key libraries, compiled artifacts, VCS and cache directories, anything that is
+    not a regular file, and files over `HASH_MAX_FILE_SIZE` are left out.
+
+    Args:
+        root (str): The project directory (default: the directory of this module).
+        cache_path (str): The digest cache, relative to `root` (None to disable it).
+
     Returns:
         str: The computed hash.
     """
-    all_files_datas = b""
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    cache_file = os.path.join(root, cache_path) if cache_path else None
+    cache, new_cache = {}, {}
+
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, "r", encoding="utf-8") as file:
+                cache = json.load(file)
+        except (OSError, ValueError):
+            cache = {}
+
+    project_hash = sha3_512()
+
+    for current, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in HASH_EXCLUDED_DIRS)
 
-    for root, _, files in os.walk(os.path.dirname(__file__)):
-        for filename in files:
-            if filename not in ["requirement.txt", "user.data", "README.md"] and "cpython" not in filename:
-                with open(os.path.join(root, filename), "rb") as file:
-                    all_files_datas += file.read()
+        for filename in sorted(files):
+            if filename in HASH_EXCLUDED_FILES or filename.endswith(HASH_EXCLUDED_SUFFIXES) or "cpython" in filename:
+                continue
 
-    return sha3_512(all_files_datas).hexdigest()
+            path = os.path.join(current, filename)
+            relative = os.path.relpath(path, root).replace(os.sep, "/")
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            # Sockets, FIFOs and devices cannot be hashed (opening a FIFO blocks)
+            if not S_ISREG(stat.st_mode) or stat.st_size > HASH_MAX_FILE_SIZE:
+                continue
+
+            signature = [stat.st_size, stat.st_mtime_ns]
+            cached = cache.get(relative)
+            digest = cached[2] if cached and cached[:2] == signature else hash_file(path)
+            new_cache[relative] = signature + [digest]
+
+            project_hash.update(relative.encode("utf-8") + b"\0" + bytes.fromhex(digest))
+
+    if cache_file and new_cache != cache:
+        with open(cache_file, "w", encoding="utf-8") as file:
+            json.dump(new_cache, file)
+
+    return project_hash.hexdigest()
 
 def first_mixer():
     """
     Initializes character mixing and parameter generation for first-time users.
     """
     if not os.path.exists("user.txt"):
+        from colorama import Fore, Style
+
         db = "all.txt"
 
         get_random_setting(db)
@@ -126,4 +210,5 @@ def first_mixer():
         with open("user.txt", "w") as file:
             file.write(mse_version_hash)
 
-first_mixer()
+if __name__ == "__main__":
+    first_mixer()